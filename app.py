@@ -1,568 +1,198 @@
 import streamlit as st
-import re
 import io
-import json
-import subprocess
-import sys
-from PIL import Image, ImageDraw, ImageFont
-from playwright.sync_api import sync_playwright
-import math
-import zipfile
-import json
 import time
-import requests
-from instabot import Bot
-import os
-import tempfile
-
-def upload_to_instagram(username, password, image_paths):
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        bot = Bot()
-        bot.login(username=username, password=password)
-        
-        for i, image_path in enumerate(image_paths):
-            # Simpan gambar ke direktori sementara
-            temp_image_path = os.path.join(tmp_dir, f"image_{i}.png")
-            with open(temp_image_path, "wb") as f:
-                f.write(requests.get(image_path).content)
-            
-            # Unggah gambar
-            caption = f"Automatically uploaded image {i+1}"
-            bot.upload_photo(temp_image_path, caption=caption)
-        
-        bot.logout()
+from top10places import (
+    PRESETS,
+    ASPECTS,
+    STRATEGIES,
+    Memo,
+    PlaceIndex,
+    available_themes,
+    create_carousel_images,
+    create_html,
+    digest,
+    encoding_summary,
+    get_job_queue,
+    get_renderer,
+    instagram,
+    parse_text,
+    provision,
+    tracing,
+    write_zip,
+    zip_entries,
+    zip_file_name,
+)
 
+def zip_buffer(entries):
+    # The archive is built in one buffer that download_button reads as is,
+    # without copying it out to bytes first
+    buffer = io.BytesIO()
+    write_zip(buffer, entries)
+    return buffer
 
-def create_scatter_plot_html(places, title):
-    if not places:
-        return "<p>No data available for scatter plot</p>"
-    # Calculate dynamic scales
-    min_reviews = min(place['reviews'] for place in places)
-    max_reviews = max(place['reviews'] for place in places)
-    min_rating = min(place['rating'] for place in places)
-    max_rating = max(place['rating'] for place in places)
-    # Add some padding to the scales
-    reviews_padding = (max_reviews - min_reviews) * 0.1
-    rating_padding = (max_rating - min_rating) * 0.1
-    x_min = max(0, min_reviews - reviews_padding)
-    x_max = max_reviews + reviews_padding
-    y_min = max(0, min_rating - rating_padding)
-    y_max = min(5, max_rating + rating_padding)
-    
-    html_template = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{title}</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-            body {{
-                font-family: 'Inter', sans-serif;
-                margin: 0;
-                padding: 0;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                height: 100vh;
-                background-color: white;
-            }}
-            #chart {{
-                width: 800px;
-                height: 600px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div id="chart"></div>
-        <script>
-            var data = [{data}];
-            var layout = {{
-                title: {{
-                    text: '{title}',
-                    font: {{ size: 24 }}
-                }},
-                xaxis: {{
-                    title: 'Number of Reviews',
-                    range: [{x_min}, {x_max}]
-                }},
-                yaxis: {{
-                    title: 'Rating',
-                    range: [{y_min}, {y_max}]
-                }},
-                hovermode: 'closest',
-                showlegend: false,
-                margin: {{ t: 50, r: 50, b: 50, l: 50 }}
-            }};
-            Plotly.newPlot('chart', data, layout, {{responsive: true}});
-        </script>
-    </body>
-    </html>
-    '''
-    scatter_data = {
-        'x': [place['reviews'] for place in places],
-        'y': [place['rating'] for place in places],
-        'mode': 'markers+text',
-        'type': 'scatter',
-        'text': [f"{place['name']}<br>{place['rating']} ★<br>{place['reviews']} reviews" for place in places],
-        'textposition': 'top center',
-        'marker': { 'size': 10 },
-        'textfont': { 'size': 10 }
+def health():
+    jobs = get_job_queue()
+    return {
+        'chromium': provision.status(),
+        'renderer': get_renderer().health(),
+        'jobs': jobs.health() if jobs is not None else None,
     }
-    return html_template.format(
-        title=title,
-        data=json.dumps([scatter_data]),
-        x_min=x_min,
-        x_max=x_max,
-        y_min=y_min,
-        y_max=y_max
-    )
-    return html_template.format(
-        title=title,
-        data=json.dumps([scatter_data]),
-        x_min=x_min,
-        x_max=x_max,
-        y_min=y_min,
-        y_max=y_max
-    )
-def create_html(places, title, area, place_type, top_n):
-    top_places = sorted(places, key=lambda x: x['reviews'], reverse=True)[:top_n]
-    top_places = sorted(top_places, key=lambda x: x['rating'], reverse=True)
-    
-    # Find the place with the most reviews and highest rating
-    most_reviews = max(top_places, key=lambda x: x['reviews'])['reviews']
-    highest_rating = max(top_places, key=lambda x: x['rating'])['rating']
-    
-    # Remove spaces from area and place_type for the footer
-    footer_area = area.replace(" ", "")
-    footer_place_type = place_type.replace(" ", "")
-    
-    html_template = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{title}</title>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-            body {{
-                font-family: 'Inter', sans-serif;
-                margin: 0;
-                padding: 20px;
-                box-sizing: border-box;
-                background-color: #ffffff;
-            }}
-            .container {{
-                width: 100%;
-                max-width: 600px;
-                margin: 0 auto;
-                box-sizing: border-box;
-            }}
-            h1 {{
-                text-align: center;
-                color: #1F2937;
-                margin-bottom: 20px;
-                font-size: 24px;
-            }}
-            .place {{
-                background-color: #F3F4F6;
-                border-radius: 8px;
-                padding: 15px;
-                margin-bottom: 15px;
-                display: flex;
-                justify-content: space-between;
-                position: relative;
-            }}
-            .place-info {{
-                flex-grow: 1;
-                padding-right: 10px;
-            }}
-            .place-name {{
-                font-size: 16px;
-                font-weight: bold;
-                color: #1F2937;
-                margin-bottom: 5px;
-            }}
-            .address {{
-                color: #6B7280;
-                font-size: 12px;
-                margin-bottom: 5px;
-            }}
-            .rating-info {{
-                text-align: right;
-                display: flex;
-                flex-direction: column;
-                justify-content: center;
-                align-items: flex-end;
-            }}
-            .rating {{
-                font-size: 24px;
-                font-weight: bold;
-                color: #1F2937;
-            }}
-            .reviews {{
-                color: #6B7280;
-                font-size: 12px;
-            }}
-            .stars {{
-                display: flex;
-                align-items: center;
-            }}
-            .footer {{
-                text-align: center;
-                color: #6B7280;
-                font-size: 10px;
-                margin-top: 10px;
-            }}
-            .label {{
-                position: absolute;
-                top: -10px;
-                padding: 2px 8px;
-                border-radius: 12px;
-                font-size: 12px;
-                font-weight: bold;
-                color: white;
-            }}
-            .perfect, .highest-rating {{
-                background-color: #10B981;
-                left: 10px;
-            }}
-            .favorite {{
-                background-color: #3B82F6;
-                right: 10px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>{title}</h1>
-            <div id="placesList"></div>
-            <div class="footer">@{footer_area}{footer_place_type}Lovers • Data akurat per Juli 2024</div>
-        </div>
-        <script>
-            const places = {places_json};
-            const mostReviews = {most_reviews};
-            const highestRating = {highest_rating};
-            function createStarRating(rating, index) {{
-                let stars = '';
-                for (let i = 0; i < 5; i++) {{
-                    const percentage = Math.max(0, Math.min(100, (rating - i) * 100));
-                    stars += `
-                        <svg width="16" height="16" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
-                            <defs>
-                                <linearGradient id="star-${{index}}-${{i}}">
-                                    <stop offset="${{percentage}}%" stop-color="#F59E0B" />
-                                    <stop offset="${{percentage}}%" stop-color="#E5E7EB" />
-                                </linearGradient>
-                            </defs>
-                            <path d="M12 2L15.09 8.26L22 9.27L17 14.14L18.18 21.02L12 17.77L5.82 21.02L7 14.14L2 9.27L8.91 8.26L12 2Z"
-                                  fill="url(#star-${{index}}-${{i}})" stroke="#F59E0B" stroke-width="1" />
-                        </svg>`;
-                }}
-                return stars;
-            }}
-            const placesList = document.getElementById('placesList');
-            places.forEach((place, index) => {{
-                const isPerfect = place.rating === 5;
-                const isHighestRating = place.rating === highestRating && !isPerfect;
-                const isMostFavorite = place.reviews === mostReviews;
-                let labels = '';
-                if (isPerfect) {{
-                    labels += '<span class="label perfect">Perfect!</span>';
-                }} else if (isHighestRating) {{
-                    labels += '<span class="label highest-rating">Highest Rating!</span>';
-                }}
-                if (isMostFavorite) {{
-                    labels += '<span class="label favorite">Most Favorite!</span>';
-                }}
-                placesList.innerHTML += `
-                    <div class="place">
-                        ${{labels}}
-                        <div class="place-info">
-                            <div class="place-name">${{index + 1}}. ${{place.name}}</div>
-                            <div class="address"><i class="fas fa-map-marker-alt"></i> ${{place.address}}</div>
-                        </div>
-                        <div class="rating-info">
-                            <div class="rating">${{place.rating.toFixed(1)}}</div>
-                            <div class="stars">${{createStarRating(place.rating, index)}}</div>
-                            <div class="reviews">dari ${{place.reviews}} reviews</div>
-                        </div>
-                    </div>
-                `;
-            }});
-        </script>
-    </body>
-    </html>
-    '''
-    return html_template.format(
-        title=title,
-        places_json=json.dumps(top_places),
-        most_reviews=most_reviews,
-        highest_rating=highest_rating,
-        footer_area=footer_area,
-        footer_place_type=footer_place_type
+
+def timing_panel(current_trace, memo):
+    # Where this generation's time went, stage by stage
+    rows = [
+        {'Stage': total['stage'], 'Calls': total['calls'], 'Time (ms)': round(total['ms'], 1),
+         'KB': round(total['bytes'] / 1024, 1) if total['bytes'] else None,
+         'Items': total['count'] or None}
+        for total in current_trace.totals()
+    ]
+    with st.expander(f"Timings ({current_trace.elapsed_ms():.0f} ms so far)", expanded=True):
+        st.table(rows)
+        stats = memo.stats()
+        st.caption(f"Reused from earlier runs: {stats['hits']} of {stats['hits'] + stats['misses']} lookups "
+                   f"({stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB kept)")
+
+def render_carousel(place_type, area, top_n, places, strategy, preset, theme, aspect, split, chart):
+    # Hand the render to the worker pool when one is configured and poll for it
+    jobs = get_job_queue()
+    if jobs is None:
+        return create_carousel_images(place_type, area, top_n, places, strategy, preset, theme, aspect, split, chart)
+    job_id = jobs.submit(
+        create_carousel_images, place_type, area, top_n, places, strategy, preset, theme, aspect, split, chart
     )
+    progress = st.empty()
+    # The queue fails stuck jobs itself; this only keeps the session from waiting forever
+    deadline = time.monotonic() + jobs.queue_timeout + jobs.job_timeout + 30
+    while True:
+        if time.monotonic() > deadline:
+            progress.empty()
+            raise TimeoutError("Rendering is taking too long; please try again.")
+        status = jobs.status(job_id)
+        if status['state'] == 'queued':
+            progress.caption(f"Waiting for a render worker (position {status['position']} in queue)...")
+        elif status['state'] == 'running':
+            progress.caption("Rendering...")
+        else:
+            break
+        time.sleep(0.2)
+    progress.empty()
+    return jobs.result(job_id)
+
+def load_places(memo, request, place_index):
+    # The parsed paste, or the session's place index when pastes are combined
+    kind, key = request['source']
+    if kind == 'index':
+        return place_index
+    text = request['text']
+
+    def parse():
+        with tracing.span("parse", bytes=len(text)) as stage:
+            places = parse_text(text)
+            stage['count'] = len(places)
+        return places
 
+    return memo.get(('parse', key), parse)
+
+def show_results(memo, request, places, clicked):
+    area, place_type, top_n, theme = request['area'], request['place_type'], request['top_n'], request['theme']
+    strategy, preset, aspect, split, chart = (request[name] for name in ('strategy', 'preset', 'aspect', 'split', 'chart'))
+    source = request['source']
     
-def install_chromium():
-    try:
-        result = subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], 
-                                capture_output=True, text=True, check=True)
-        st.write(result.stdout)
-    except subprocess.CalledProcessError as e:
-        st.error("Failed to install Chromium.")
-        st.error(e.stderr)
-        raise
-def parse_text(text):
-    places = []
-    pattern = r'(.*?)\n(\d+[,\.]\d+)\((\d+(?:\.\d+)?)\)(.*?)(?=\n\n|\Z)'
-    matches = re.findall(pattern, text, re.DOTALL)
+    def build_html():
+        # Update this line to include top_n
+        with tracing.span("create_html") as stage:
+            html_output = create_html(places, f"Top {top_n} {place_type} in {area}", area, place_type, top_n, strategy, theme)
+            stage['bytes'] = len(html_output)
+        return html_output
+
+    html_output = memo.get(('html', source, area, place_type, top_n, strategy, theme), build_html)
+    render_key = ('render', source, area, place_type, top_n, strategy, preset, theme, aspect, split, chart)
     
-    for match in matches:
-        lines = match[0].strip().split('\n')
-        name = lines[-1] if lines else ""
-        rating = float(match[1].replace(',', '.'))
-        reviews = int(float(match[2].replace('.', '').replace(',', '')))
-        
-        # Improved address extraction logic
-        address = ""
-        if match[3].strip():
-            address_lines = match[3].strip().split('\n')
-            if address_lines:
-                first_line = address_lines[0]
-                if '· $' in first_line or '· $$' in first_line or '· $$$' in first_line:
-                    # Handle case with price indicators
-                    if len(address_lines) > 1:
-                        second_line = address_lines[1]
-                        last_dot_index = second_line.rfind('· ')
-                        if last_dot_index != -1 and last_dot_index + 2 < len(second_line):
-                            address = second_line[last_dot_index + 2:].strip()
-                        else:
-                            address = second_line.strip()
-                else:
-                    # Handle case without price indicators
-                    last_dot_index = first_line.rfind('· ')
-                    if last_dot_index != -1 and last_dot_index + 2 < len(first_line):
-                        address = first_line[last_dot_index + 2:].strip()
-                    else:
-                        address = first_line.strip()
+    def render():
+        if provision.status()['status'] in ('idle', 'checking', 'installing'):
+            with st.spinner("Preparing the browser..."):
+                provision.wait()
         
-        places.append({
-            'name': name,
-            'rating': rating,
-            'reviews': reviews,
-            'address': address
-        })
-    
-    return places
-    
-def create_poster_html(place_type, area, top_n):
-    html_template = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Poster</title>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-            body {{
-                font-family: 'Inter', sans-serif;
-                margin: 0;
-                padding: 0;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                height: 100vh;
-                background-color: white;
-            }}
-            .poster-container {{
-                width: 600px;
-                height: 800px;
-                display: flex;
-                flex-direction: column;
-                justify-content: center;
-                align-items: center;
-                text-align: center;
-                padding: 20px;
-                box-sizing: border-box;
-            }}
-            .title {{
-                font-size: 48px;
-                font-weight: bold;
-                margin-bottom: 20px;
-                color: #1F2937;
-            }}
-            .subtitle {{
-                font-size: 24px;
-                font-style: italic;
-                color: #6B7280;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="poster-container">
-            <h1 class="title">Top {top_n} {place_type} terbaik<br>di {area}</h1>
-            <p class="subtitle">Menurut google reviews</p>
-        </div>
-    </body>
-    </html>
-    '''
-    return html_template.format(place_type=place_type, area=area, top_n=top_n)
+        # Render the poster, the top-N list and the final poster concurrently
+        with st.spinner(f"Generating Top {top_n} images..."):
+            with tracing.span("render") as stage:
+                images = render_carousel(
+                    place_type, area, top_n, places, strategy, preset, theme, aspect, split, chart
+                )
+                stage.update(count=len(images), bytes=sum(len(image) for image in images))
+        return images
 
-def create_poster_image(place_type, area, top_n):
-    html_content = create_poster_html(place_type, area, top_n)
+    # A failed render is shown again on reruns and only retried on the next click
+    if not request.get('error'):
+        try:
+            images = memo.get(render_key, render)
+        except Exception as e:
+            request['error'] = str(e)
+    if request.get('error'):
+        st.error(f"An error occurred while generating the image: {request['error']}")
+        st.info("You can still use the HTML version below.")
+        st.components.v1.html(html_output, height=800, scrolling=True)
+        return None
+    if clicked:
+        st.success(f"Top {top_n} image generated successfully!")
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page(viewport={'width': 600, 'height': 800})
-        page.set_content(html_content)
-        
-        # Wait for any animations or fonts to load
-        page.wait_for_timeout(1000)
-        
-        # Capture the screenshot
-        screenshot = page.screenshot()
-        browser.close()
+    # Display poster image
+    st.image(images[0].data, caption="Poster", use_column_width=True)
     
-    # Convert the screenshot to a PIL Image
-    image = Image.open(io.BytesIO(screenshot))
+    # Display HTML content
+    st.components.v1.html(html_output, height=800, scrolling=True)
+    st.markdown(f"### Top {top_n} Places")
+    st.info(f"The image above shows the top {top_n} places.")
     
-    return image
-def html_to_image_top10(html_content):
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page(viewport={'width': 600, 'height': 800})
-        page.set_content(html_content)
-        
-        # Wait for any animations or lazy-loaded content to finish
-        page.wait_for_timeout(1000)
-        
-        # Get the bounding box of the content
-        bounding_box = page.evaluate('''() => {
-            const body = document.body;
-            const html = document.documentElement;
-            const height = Math.max(
-                body.scrollHeight, body.offsetHeight,
-                html.clientHeight, html.scrollHeight, html.offsetHeight
-            );
-            return {
-                width: document.documentElement.clientWidth,
-                height: height
-            };
-        }''')
-        
-        # Calculate the aspect ratio
-        aspect_ratio = 800 / 600
-        content_ratio = bounding_box['height'] / bounding_box['width']
-        
-        if content_ratio > aspect_ratio:
-            # Content is taller, adjust width
-            new_width = math.ceil(bounding_box['height'] / aspect_ratio)
-            page.set_viewport_size({'width': new_width, 'height': bounding_box['height']})
-        else:
-            # Content is wider, adjust height
-            new_height = math.ceil(bounding_box['width'] * aspect_ratio)
-            page.set_viewport_size({'width': bounding_box['width'], 'height': new_height})
-        
-        # Capture the screenshot
-        screenshot = page.screenshot(full_page=True)
-        browser.close()
-        
-        return screenshot, bounding_box['height']
-def html_to_image(html_content):
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page(viewport={'width': 600, 'height': 800})
-        page.set_content(html_content)
-        
-        # Wait for any animations or lazy-loaded content to finish
-        page.wait_for_timeout(1000)
-        
-        # Capture the screenshot
-        screenshot = page.screenshot(full_page=True)
-        browser.close()
-        
-        return screenshot
-def create_final_poster_html():
-    html_template = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Poster</title>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-            body {{
-                font-family: 'Inter', sans-serif;
-                margin: 0;
-                padding: 0;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                height: 100vh;
-                background-color: white;
-            }}
-            .poster-container {{
-                width: 600px;
-                height: 800px;
-                display: flex;
-                flex-direction: column;
-                justify-content: center;
-                align-items: center;
-                text-align: center;
-                padding: 20px;
-                box-sizing: border-box;
-            }}
-            .title {{
-                font-size: 48px;
-                font-weight: bold;
-                margin-bottom: 20px;
-                color: #1F2937;
-            }}
-            .subtitle {{
-                font-size: 24px;
-                font-style: italic;
-                color: #6B7280;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="poster-container">
-            <h1 class="title"><br><br><br><br><br><br><br><br>Komen dibawah, spot apa lagi yang harus di-ranking?</h1>
-            <p class="subtitle"></p>
-        </div>
-    </body>
-    </html>
-    '''
-    return html_template
-def create_final_poster_image():
-    html_content = create_final_poster_html()
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page(viewport={'width': 600, 'height': 800})
-        page.set_content(html_content)
-        
-        # Wait for any animations or fonts to load
-        page.wait_for_timeout(1000)
-        
-        # Capture the screenshot
-        screenshot = page.screenshot()
-        browser.close()
-    
-    # Convert the screenshot to a PIL Image
-    image = Image.open(io.BytesIO(screenshot))
+    # Display the final poster
+    st.image(images[-1].data, caption="Final Poster", use_column_width=True)
     
-    return image
+    # Report what the chosen format cost and saved per image
+    entries = zip_entries(images, top_n, chart)
+    st.caption("  \n".join(encoding_summary(entries)))
     
+    # The ZIP is only assembled when the button is clicked, once per result,
+    # and downloading does not rerun the app
+    st.download_button(
+        label="Download All Images",
+        data=lambda: memo.get(('zip',) + render_key[1:], lambda: zip_buffer(entries)),
+        file_name=zip_file_name(top_n, place_type, area),
+        mime="application/zip",
+        on_click="ignore",
+    )
+    return images
+
+def upload(images, request, username, password):
+    area, place_type, top_n = request['area'], request['place_type'], request['top_n']
+    st.header("Upload to Instagram")
+    # Timings of this upload, kept even if it fails part way
+    metrics = []
+    try:
+        # The client (and its login) is kept per account and password across reruns
+        client = instagram.get_client(username, password)
+        with st.spinner("Uploading the carousel..."), tracing.span("upload", count=len(images)):
+            client.upload_carousel(images, caption=f"Top {top_n} {place_type} in {area}", metrics=metrics)
+        st.success("Images uploaded to Instagram successfully!")
+    except Exception as e:
+        st.error(f"Failed to upload images to Instagram. Error: {str(e)}")
+    st.caption("  \n".join(
+        f"{m['step']}: {m['ms']:.0f} ms" + (f" ({m['attempts']} attempts)" if m['attempts'] > 1 else "")
+        for m in metrics
+    ))
+
 def main():
-    install_chromium()
+    # Checks (and if needed installs) Chromium once per process in the background
+    provision.ensure_chromium()
+    # TOP10PLACES_METRICS_PORT serves Prometheus metrics; TOP10PLACES_TRACE_LOG logs each generation
+    tracing.serve_metrics()
+    tracing.configure_logging()
+    if "health" in st.query_params:
+        st.json(health())
+        return
+    if "metrics" in st.query_params:
+        st.code(tracing.metrics(), language="text")
+        return
+    
     st.title("Top Places Generator")
     st.header("Cara Kerja:")
     st.write("""1. Cari tempat yang ingin kamu extract top-nya di google maps. Buka google maps.
@@ -577,84 +207,71 @@ def main():
     place_type = st.text_input("Enter the type of place (untuk judul juga):")
     top_n = st.radio("Choose the number of top places:", ("5", "10"))
     top_n = int(top_n)
+    strategy = st.selectbox(
+        "Rank places by:", list(STRATEGIES), format_func=lambda name: STRATEGIES[name].label
+    )
+    theme = st.selectbox("Design:", available_themes(), format_func=str.capitalize)
+    aspect = st.radio("Frame shape:", list(ASPECTS), horizontal=True)
+    split = st.checkbox("Split long lists across several frames")
+    chart = st.checkbox("Add a rating vs. reviews chart")
+    preset = st.selectbox(
+        "Image format:", list(PRESETS), format_func=lambda name: PRESETS[name].label
+    )
     text_input = st.text_area("Enter the place data (untuk diparsing dan dibuatkan poster):", height=300)
+    # Places from earlier pastes in this session, deduplicated by name and address
+    place_index = st.session_state.setdefault('place_index', PlaceIndex())
+    combine = st.checkbox("Combine with places pasted earlier (duplicates are merged)")
+    if combine and len(place_index):
+        if st.button("Clear collected places"):
+            place_index.clear()
+            st.session_state.pop('request', None)
+        else:
+            st.caption(f"{len(place_index)} places collected so far.")
 
     username = st.text_input("Instagram Username (fill this if u want to upload to your instagram.)")
     password = st.text_input("Instagram Password (fill this if u want to upload to your instagram.)", type="password")
-    if st.button("Generate Images"):
+    show_timings = st.checkbox("Show timings")
+    # Outputs of earlier runs in this session, reused while their inputs are unchanged
+    memo = st.session_state.setdefault('memo', Memo())
+    clicked = st.button("Generate Images")
+    if clicked:
         if area and place_type and text_input:
-            places = parse_text(text_input)
+            if combine:
+                with tracing.span("parse", bytes=len(text_input)) as stage:
+                    stats = place_index.ingest(text_input)
+                    stage['count'] = len(place_index)
+                st.caption(f"{stats['parsed']} places in this paste: {stats['added']} new, {stats['updated']} updated, "
+                           f"{stats['unchanged']} already known. {len(place_index)} places in total.")
+                source = ('index', place_index.revision)
+            else:
+                source = ('paste', digest(text_input))
+            request = {
+                'source': source, 'text': text_input, 'area': area, 'place_type': place_type, 'top_n': top_n,
+                'strategy': strategy, 'preset': preset, 'theme': theme, 'aspect': aspect, 'split': split,
+                'chart': chart,
+            }
             
             # Log data yang diproses
             # st.write("Processed data:")
             # st.write(places)
             
-            if not places:
+            if not load_places(memo, request, place_index):
                 st.error("No valid data found. Please check your input.")
+                st.session_state.pop('request', None)
                 return
-            
-            # Update this line to include top_n
-            html_output = create_html(places, f"Top {top_n} {place_type} in {area}", area, place_type, top_n)
-            
-            # Create and display poster image
-            poster_image = create_poster_image(place_type, area, top_n)
-            st.image(poster_image, caption="Poster", use_column_width=True)
-            
-            # Display HTML content
-            st.components.v1.html(html_output, height=800, scrolling=True)
-            st.markdown(f"### Top {top_n} Places")
-            st.info(f"The image above shows the top {top_n} places.")
-            
-            # Convert HTML to image
-            with st.spinner(f"Generating Top {top_n} image..."):
-                try:
-                    html_image, html_height = html_to_image_top10(html_output)
-                    
-                    if html_image is not None:
-                        st.success(f"Top {top_n} image generated successfully!")
-                    else:
-                        st.warning(f"Failed to generate the Top {top_n} image. You can still use the HTML version above.")
-                except Exception as e:
-                    st.error(f"An error occurred while generating the image: {str(e)}")
-                    st.info("You can still use the HTML version above.")
-            
-            # Display the final poster
-            final_poster_image = create_final_poster_image()
-            st.image(final_poster_image, caption="Final Poster", use_column_width=True)
-            
-            # Create a zip file containing all images
-            with io.BytesIO() as zip_buffer:
-                with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-                    # Convert PIL Image to bytes
-                    poster_bytes = io.BytesIO()
-                    poster_image.save(poster_bytes, format='PNG')
-                    poster_bytes = poster_bytes.getvalue()
-        
-                    zip_file.writestr("poster.png", poster_bytes)
-                    zip_file.writestr(f"top_{top_n}.png", html_image)
-                    
-                    # Add the new final poster
-                    final_poster_bytes = io.BytesIO()
-                    final_poster_image.save(final_poster_bytes, format='PNG')
-                    final_poster_bytes = final_poster_bytes.getvalue()
-                    zip_file.writestr("final_poster.png", final_poster_bytes)
-                
-                zip_buffer.seek(0)
-                st.download_button(
-                    label="Download All Images",
-                    data=zip_buffer.getvalue(),
-                    file_name=f"top_{top_n}_{place_type}_{area}_images.zip",
-                    mime="application/zip"
-                )
-            
-            if username and password and text_input:
-                st.header("Upload to Instagram")
-                image_paths = ["poster.png", f"top_{top_n}.png", "final_poster.png"]
-                try:
-                    upload_to_instagram(username, password, image_paths)
-                    st.success("Images uploaded to Instagram successfully!")
-                except Exception as e:
-                    st.error(f"Failed to upload images to Instagram. Error: {str(e)}")
-                    
+            # Kept across reruns, so the results stay up while other widgets change
+            st.session_state['request'] = request
+    
+    request = st.session_state.get('request')
+    if request is not None:
+        images = show_results(memo, request, load_places(memo, request, place_index), clicked)
+        # Uploads only follow a click, never a rerun
+        if images and clicked and username and password:
+            upload(images, request, username, password)
+    if show_timings:
+        timing_panel(tracing.current(), memo)
+
 if __name__ == "__main__":
-    main()
+    # Runs that generate nothing record no spans and are not exported
+    with tracing.trace("generate"):
+        main()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import time
+
+# Cold-start budget for the headless core.
+#
+#     python benchmarks/bench_import.py
+#
+# Runs each probe in a fresh interpreter several times and keeps the best
+# result. Exits non-zero if the lean core pulls in a heavy dependency or any
+# probe exceeds its budget.
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY_MODULES = ("streamlit", "playwright", "PIL", "instabot", "requests", "asyncio", "jinja2")
+IMPORT_BUDGET_MS = 25
+CLI_BUDGET_MS = 150
+RUNS = 5
+
+
+def import_time_ms():
+    # Cumulative import time of the package as reported by -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import top10places"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "top10places":
+            return int(fields[1]) / 1000
+    raise RuntimeError("top10places missing from -X importtime output")
+
+
+def cli_time_ms():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "top10places", "--help"], cwd=ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def loaded_heavy_modules():
+    code = f"import sys, top10places; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def main():
+    ok = True
+    heavy = loaded_heavy_modules()
+    if heavy:
+        ok = False
+        print(f"import top10places loads heavy modules: {', '.join(heavy)}")
+
+    for label, probe, budget in [
+        ("import top10places", import_time_ms, IMPORT_BUDGET_MS),
+        ("python -m top10places --help", cli_time_ms, CLI_BUDGET_MS),
+    ]:
+        best = min(probe() for _ in range(RUNS))
+        within = best <= budget
+        ok = ok and within
+        print(f"{label:<32}{best:>8.1f} ms  (budget {budget} ms){'' if within else '  OVER BUDGET'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
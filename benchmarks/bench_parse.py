@@ -0,0 +1,56 @@
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from top10places import extract_address, parse_text
+from synthetic import generate_paste
+
+# Compare the line-oriented parser against the original whole-text regex.
+#
+#     python benchmarks/bench_parse.py [count ...]
+
+
+def legacy_parse_text(text):
+    places = []
+    pattern = r'(.*?)\n(\d+[,\.]\d+)\((\d+(?:\.\d+)?)\)(.*?)(?=\n\n|\Z)'
+    for match in re.findall(pattern, text, re.DOTALL):
+        lines = match[0].strip().split('\n')
+        places.append({
+            'name': lines[-1] if lines else "",
+            'rating': float(match[1].replace(',', '.')),
+            'reviews': int(float(match[2].replace('.', '').replace(',', ''))),
+            'address': extract_address(match[3])
+        })
+    return places
+
+
+def timed(fn, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(counts):
+    cases = [(f"{count} listings", generate_paste(count)) for count in counts]
+    # A paste whose tail never reaches a rating line makes the lazy regex
+    # rescan the rest of the text from every starting position.
+    tail = "\n\nHasil lainnya\n\n" + "\n\n".join(f"Iklan {i}" for i in range(2000))
+    cases.append(("1000 listings + 2000-block tail", generate_paste(1000) + tail))
+
+    print(f"{'input':<32}{'regex':>10}{'stream':>10}{'speedup':>9}")
+    for label, text in cases:
+        legacy_time, legacy = timed(legacy_parse_text, text)
+        stream_time, places = timed(parse_text, text)
+        assert list(places) == legacy, f"parsers disagree on {label}"
+        print(f"{label:<32}{legacy_time:>9.3f}s{stream_time:>9.3f}s{legacy_time / stream_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 30000, 100000])
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from top10places import parse_text
+from top10places import rank
+from synthetic import generate_paste
+
+# Compare heap-based top-N selection on the Places columns against the
+# original double sort over a list of dicts.
+#
+#     python benchmarks/bench_rank.py [count ...]
+
+
+def legacy_rank(places, top_n):
+    top_places = sorted(places, key=lambda x: x['reviews'], reverse=True)[:top_n]
+    top_places = sorted(top_places, key=lambda x: x['rating'], reverse=True)
+    most_reviews = max(top_places, key=lambda x: x['reviews'])['reviews']
+    highest_rating = max(top_places, key=lambda x: x['rating'])['rating']
+    return top_places, most_reviews, highest_rating
+
+
+def timed(fn, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(counts, top_n=10):
+    print(f"{'places':>8}{'double sort':>14}{'heap':>10}{'speedup':>9}")
+    for count in counts:
+        places = parse_text(generate_paste(count))
+        legacy_time, legacy = timed(legacy_rank, list(places), top_n)
+        heap_time, ranking = timed(rank, places, top_n)
+        assert (list(ranking['places']), ranking['most_reviews'], ranking['highest_rating']) == legacy
+        print(f"{count:>8}{legacy_time * 1000:>12.2f}ms{heap_time * 1000:>8.2f}ms"
+              f"{legacy_time / heap_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,378 @@
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, ".."))
+
+from suite import machine, peak_rss_mb, percentile
+from synthetic import LOCALES, generate_paste
+
+# Load test for the whole "Generate Images" pipeline.
+#
+#     python benchmarks/loadtest.py                               # 10, 50 and 100 sessions at once
+#     python benchmarks/loadtest.py -c 20 --rate 2 --duration 60  # 2 arrivals/s, at most 20 in flight
+#     python benchmarks/loadtest.py --upload --label 1.4 -o report.json
+#     python benchmarks/loadtest.py --compare report.json         # fail if this run is worse
+#
+# Every request does what one click does in app.py: parse a synthetic paste
+# (a different one per request), build the list HTML, render the carousel
+# (on the shared renderer, or the worker pool when RENDER_WORKERS is set),
+# assemble the ZIP and, with --upload, post it to a local MockInstagram, so
+# nothing leaves the machine. Chromium has to be installed.
+#
+# Every request of a run gets its own seed, from a random start that is
+# stored in the report (--seed repeats it), so no paste repeats within or
+# across runs. The render cache is off unless --cache turns it on, and then
+# it starts empty in a temporary directory: releases are compared on
+# rendering, not on cache reads.
+#
+# Without --rate a level is closed-loop: -c sessions generate back to back
+# until --requests are done, and latency is the time of one generation.
+# With --rate requests arrive as a Poisson process and wait for one of the
+# -c session slots, and latency runs from arrival to completion. A sampler
+# watches this process tree for the Chromium process count and the total
+# RSS of the Python and Chromium processes (Linux only).
+
+REPORT = "loadtest-report.json"
+LEVELS = (10, 50, 100)
+SAMPLE_INTERVAL = 0.25
+
+
+def process_tree():
+    # (pid, cmdline) of this process and all its descendants, from /proc
+    parents = {}
+    commands = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                commands[int(entry)] = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+        except OSError:
+            continue
+        # The command name in brackets may contain spaces; ppid follows it
+        parents[int(entry)] = int(stat[stat.rindex(b")") + 2:].split()[1])
+    tree = {os.getpid()}
+    grew = True
+    while grew:
+        children = {pid for pid, parent in parents.items() if parent in tree and pid not in tree}
+        tree |= children
+        grew = bool(children)
+    return [(pid, commands.get(pid, "")) for pid in tree]
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+class Sampler:
+    # Peak Chromium process count and process-tree RSS while a level runs
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.supported = os.path.isdir("/proc/self")
+        self.max_chromium = 0
+        self.peak_tree_rss_mb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        processes = process_tree()
+        chromium = sum(1 for _, command in processes if "chrom" in command.lower())
+        self.max_chromium = max(self.max_chromium, chromium)
+        self.peak_tree_rss_mb = max(self.peak_tree_rss_mb, sum(rss_mb(pid) for pid, _ in processes))
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        if self.supported:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.sample()
+
+    def result(self):
+        if not self.supported:
+            return {'max_chromium': None, 'peak_tree_rss_mb': None}
+        return {'max_chromium': self.max_chromium, 'peak_tree_rss_mb': self.peak_tree_rss_mb}
+
+
+class Pipeline:
+    def __init__(self, args, client=None):
+        self.args = args
+        self.client = client
+
+    def render(self, *render_args):
+        from top10places import create_carousel_images, get_job_queue
+
+        # The same route app.render_carousel takes
+        jobs = get_job_queue()
+        if jobs is None:
+            return create_carousel_images(*render_args)
+        return jobs.result(jobs.submit(create_carousel_images, *render_args))
+
+    def __call__(self, number):
+        from top10places import create_html, parse_text, write_zip, zip_entries, zip_file_name
+        from top10places.tracing import span, trace
+
+        args = self.args
+        area, place_type, top_n = "Bandung", "Cafe", args.top_n
+        text = generate_paste(args.places, seed=number, locale=args.locale)
+        with trace("loadtest", export=False, request=number) as current:
+            with span("parse", bytes=len(text)) as stage:
+                places = parse_text(text)
+                stage['count'] = len(places)
+            with span("create_html") as stage:
+                html_output = create_html(places, f"Top {top_n} {place_type} in {area}", area, place_type, top_n)
+                stage['bytes'] = len(html_output)
+            with span("render") as stage:
+                images = self.render(place_type, area, top_n, places, "reviews", args.preset)
+                stage.update(count=len(images), bytes=sum(len(image) for image in images))
+            buffer = io.BytesIO()
+            write_zip(buffer, zip_entries(images, top_n))
+            if self.client is not None:
+                with span("upload", count=len(images)):
+                    self.client.upload_carousel(images, caption=zip_file_name(top_n, place_type, area))
+        return current.totals()
+
+
+def run_level(pipeline, concurrency, requests=None, rate=None, duration=None, first=0):
+    # Requests are numbered (and seeded) from ``first``. Returns one outcome
+    # per request: (latency ms, stage totals or None, (type, message) or None)
+    outcomes = []
+    lock = threading.Lock()
+
+    def attempt(number, arrived):
+        try:
+            totals, error = pipeline(number), None
+        except Exception as e:
+            lines = str(e).strip().splitlines()
+            totals, error = None, (type(e).__name__, lines[0][:100] if lines else "")
+        with lock:
+            outcomes.append(((time.perf_counter() - arrived) * 1000, totals, error))
+
+    start = time.perf_counter()
+    if rate is None:
+        numbers = iter(range(first, first + requests))
+
+        def session():
+            for number in numbers:
+                attempt(number, time.perf_counter())
+
+        # next() on a shared range iterator is atomic, so sessions never repeat a request
+        threads = [threading.Thread(target=session) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        rng = random.Random(first)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            number, arrival = first, start
+            while arrival - start < duration:
+                time.sleep(max(0, arrival - time.perf_counter()))
+                pool.submit(attempt, number, arrival)
+                number += 1
+                arrival += rng.expovariate(rate)
+    return outcomes, time.perf_counter() - start
+
+
+def summarize(outcomes, elapsed):
+    latencies = sorted(ms for ms, _, error in outcomes if error is None)
+    # Failures by exception type, with the first message seen for each
+    errors = {}
+    for _, _, error in outcomes:
+        if error is not None:
+            name, message = error
+            entry = errors.setdefault(name, {'count': 0, 'message': message})
+            entry['count'] += 1
+    stages = {}
+    for _, totals, _ in outcomes:
+        for total in totals or ():
+            stages.setdefault(total['stage'], []).append(total['ms'])
+    result = {
+        'requests': len(outcomes),
+        'ok': len(latencies),
+        'failed': len(outcomes) - len(latencies),
+        'failure_rate': (len(outcomes) - len(latencies)) / len(outcomes) if outcomes else 0,
+        'errors': errors,
+        'elapsed_s': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'latency_ms': None,
+        'stages_p50_ms': {name: percentile(sorted(values), 0.5) for name, values in stages.items()},
+    }
+    if latencies:
+        result['latency_ms'] = {
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1],
+        }
+    return result
+
+
+def level_name(level):
+    if level['rate'] is None:
+        return f"c{level['concurrency']}"
+    return f"c{level['concurrency']}@{level['rate']:g}/s"
+
+
+def print_level(level):
+    latency = level['latency_ms'] or {}
+    cells = [f"{latency.get(name, 0):>9.0f}" for name in ('p50', 'p95', 'p99')]
+    chromium = "-" if level['max_chromium'] is None else level['max_chromium']
+    rss = "-" if level['peak_tree_rss_mb'] is None else f"{level['peak_tree_rss_mb']:.0f}"
+    print(f"{level_name(level):<14}{level['requests']:>6}{''.join(cells)}{level['throughput']:>9.2f}"
+          f"{level['failure_rate']:>8.1%}{chromium:>9}{rss:>9}")
+    for error, entry in level['errors'].items():
+        print(f"{'':<14}{entry['count']:>6} x {error}: {entry['message']}")
+
+
+def compare(report, previous, tolerance, failure_tolerance):
+    # Regressions of this report against an earlier one, level by level
+    earlier = {level_name(level): level for level in previous['levels']}
+    problems = []
+    for level in report['levels']:
+        name = level_name(level)
+        before = earlier.get(name)
+        if before is None:
+            continue
+        if level['failure_rate'] > before['failure_rate'] + failure_tolerance:
+            problems.append(f"{name}: failure rate {before['failure_rate']:.1%} -> {level['failure_rate']:.1%}")
+        if level['latency_ms'] and before['latency_ms']:
+            old, new = before['latency_ms']['p95'], level['latency_ms']['p95']
+            if old and new / old - 1 > tolerance:
+                problems.append(f"{name}: p95 {old:.0f} -> {new:.0f} ms ({new / old - 1:+.0%})")
+        if before['throughput'] and level['throughput'] / before['throughput'] - 1 < -tolerance:
+            problems.append(f"{name}: throughput {before['throughput']:.2f} -> {level['throughput']:.2f}/s")
+        if level['peak_tree_rss_mb'] and before.get('peak_tree_rss_mb'):
+            change = level['peak_tree_rss_mb'] / before['peak_tree_rss_mb'] - 1
+            if change > tolerance:
+                problems.append(f"{name}: peak RSS {before['peak_tree_rss_mb']:.0f} -> "
+                                f"{level['peak_tree_rss_mb']:.0f} MB ({change:+.0%})")
+    return problems
+
+
+def main(argv=None):
+    from top10places.encoding import PRESETS
+
+    parser = argparse.ArgumentParser(description="Load-test the generation pipeline at several concurrency levels.")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=list(LEVELS),
+                        help="simultaneous sessions, one level each (default 10 50 100)")
+    parser.add_argument("-n", "--requests", type=int, default=None,
+                        help="requests per closed-loop level (default 2 per session)")
+    parser.add_argument("--rate", type=float, help="open loop: arrivals per second instead of back-to-back")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals with --rate (default 30)")
+    parser.add_argument("--places", type=int, default=50, help="places per synthetic paste (default 50)")
+    parser.add_argument("--locale", choices=list(LOCALES), default="id", help="synthetic paste locale")
+    parser.add_argument("--top-n", type=int, default=10, help="places per carousel (default 10)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="png", help="image format preset (default png)")
+    parser.add_argument("--cache", action="store_true",
+                        help="use the render cache, starting empty (default: off, so every frame renders)")
+    parser.add_argument("--seed", type=int, help="first paste seed (default: random, stored in the report)")
+    parser.add_argument("--upload", action="store_true", help="post every carousel to a local MockInstagram")
+    parser.add_argument("--upload-latency", type=float, default=0.05,
+                        help="seconds the mock waits per request (default 0.05)")
+    parser.add_argument("--label", help="release or commit this run belongs to, stored in the report")
+    parser.add_argument("-o", "--output", default=REPORT, help=f"report JSON (default {REPORT})")
+    parser.add_argument("--compare", metavar="REPORT", help="earlier report to check this run against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95, throughput and RSS change against --compare (default 0.25)")
+    parser.add_argument("--failure-tolerance", type=float, default=0.01,
+                        help="allowed failure rate increase against --compare (default 0.01)")
+    args = parser.parse_args(argv)
+
+    # Read when the renderer (or a render worker) is first created
+    cache_dir = tempfile.TemporaryDirectory()
+    if args.cache:
+        os.environ["RENDER_CACHE_DIR"] = cache_dir.name
+    else:
+        os.environ["RENDER_CACHE_DIR"] = ""
+        os.environ["RENDER_CACHE_MEMORY_MB"] = "0"
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 31)
+    seed = args.seed
+
+    from top10places import get_job_queue, get_renderer
+
+    client = mock = None
+    session_dir = tempfile.TemporaryDirectory()
+    if args.upload:
+        from top10places.instagram import Client, MockInstagram
+
+        mock = MockInstagram(latency=args.upload_latency)
+        client = Client('demo', 'secret', base_url=mock.start(), session_dir=session_dir.name, backoff=0.05)
+    pipeline = Pipeline(args, client)
+
+    # One warm-up request launches Chromium (and the workers) outside the measurements
+    try:
+        pipeline(seed)
+    except Exception as e:
+        print(f"warm-up failed ({type(e).__name__}: {e}); continuing", file=sys.stderr)
+
+    seed += 1
+    report = {'label': args.label, 'machine': machine(), 'options': vars(args), 'levels': []}
+    print(f"{'level':<14}{'reqs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'failed':>8}"
+          f"{'chromium':>9}{'RSS MB':>9}")
+    try:
+        for concurrency in args.concurrency:
+            requests = args.requests or concurrency * 2
+            with Sampler() as sampler:
+                outcomes, elapsed = run_level(pipeline, concurrency, requests, args.rate, args.duration, seed)
+            seed += len(outcomes)
+            level = dict(summarize(outcomes, elapsed), concurrency=concurrency, rate=args.rate, **sampler.result())
+            level['renderer'] = get_renderer().health()
+            jobs = get_job_queue()
+            level['jobs'] = jobs.health() if jobs is not None else None
+            report['levels'].append(level)
+            print_level(level)
+    finally:
+        if mock is not None:
+            report['uploads'] = {'posts': len(mock.posts), 'logins': mock.logins}
+            mock.stop()
+        session_dir.cleanup()
+        cache_dir.cleanup()
+    report['peak_rss_mb'] = peak_rss_mb()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+        f.write("\n")
+    print(f"report written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance, args.failure_tolerance)
+        for problem in problems:
+            print(f"REGRESSED {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, ".."))
+
+from synthetic import LOCALES, generate_paste
+
+# Benchmark suite for the generation stages, checked against a baseline.
+#
+#     python benchmarks/suite.py                      # run and compare with baseline.json
+#     python benchmarks/suite.py --filter parse       # only cases starting with "parse"
+#     python benchmarks/suite.py --save-baseline      # record this machine's numbers
+#
+# Every case runs in a fresh interpreter, so peak RSS belongs to that case
+# alone (the Python process; Chromium's own processes are not counted).
+# A case warms up, then samples until it has --repeat timings or has used
+# --budget seconds, whichever comes first (at least five). Cases whose p50 or
+# peak RSS grew past the tolerance are reported as REGRESSED and the suite
+# exits 1. Render cases need Chromium and are skipped without it; their
+# render cache is disabled so every sample really renders.
+
+BASELINE = os.path.join(BENCHMARKS, "baseline.json")
+SIZES = (100, 1000, 10000)
+RENDER_PLACES = 50
+MIN_SAMPLES = 5
+# Below this a p50 change is timer noise, whatever the percentage
+MIN_DELTA_MS = 0.5
+
+
+class Skip(Exception):
+    pass
+
+
+def places(count, locale='id'):
+    from top10places import parse_text
+
+    return parse_text(generate_paste(count, locale=locale))
+
+
+def parse_case(count, locale):
+    from top10places import parse_text
+
+    text = generate_paste(count, locale=locale)
+    return lambda: parse_text(text), count
+
+
+def rank_case(count):
+    # The top-N selection create_html runs before templating
+    from top10places import rank
+
+    data = places(count)
+    return lambda: rank(data, 10), count
+
+
+def ingest_case(count):
+    # Merging a paste of 100 new places into an index already holding count
+    # places and a top 10; every sample gets a fresh index, built untimed
+    from top10places import PlaceIndex
+
+    base, chunk = generate_paste(count), generate_paste(100, seed=1)
+
+    def prepare():
+        index = PlaceIndex()
+        index.ingest(base)
+        index.ranking(10)
+        return index
+
+    def merge(index):
+        stats = index.ingest(chunk)
+        index.ranking(10)
+        return stats
+
+    return merge, 100, prepare
+
+
+def html_case(count):
+    from top10places import create_html
+
+    data = places(count)
+    return lambda: create_html(data, "Top 10 Cafe in Bandung", "Bandung", "Cafe", 10), count
+
+
+def frames_case(count):
+    from top10places import carousel_frames
+
+    data = places(count)
+    return lambda: carousel_frames(data, "Bandung", "Cafe", 10, split=True), count
+
+
+def render_case(name):
+    from top10places import render
+    from top10places.pages import create_html, create_poster_html
+    from top10places.renderer import get_renderer
+
+    renderer = get_renderer()
+    try:
+        renderer.warm(timeout=60)
+    except Exception as e:
+        raise Skip(f"Chromium unavailable ({type(e).__name__})")
+    renderer.cache = None
+    data = places(RENDER_PLACES)
+    html_content = create_html(data, "Top 10 Cafe in Bandung", "Bandung", "Cafe", 10)
+    frames = render.carousel_frames(data, "Bandung", "Cafe", 10)
+    cases = {
+        'poster': (lambda: render.create_poster_image("Cafe", "Bandung", 10), 1),
+        'list': (lambda: render.html_to_image_top10(html_content), 1),
+        'final': (lambda: render.create_final_poster_image(), 1),
+        'page': (lambda: render.html_to_image(create_poster_html("Cafe", "Bandung", 10)), 1),
+        'frames': (lambda: render.capture_frames(frames), len(frames)),
+        'carousel': (lambda: render.create_carousel_images("Cafe", "Bandung", 10, data), len(frames)),
+    }
+    return cases[name]
+
+
+def case_table():
+    cases = {}
+    for locale in LOCALES:
+        for count in SIZES:
+            cases[f"parse.{locale}.{count}"] = (parse_case, count, locale)
+    for count in SIZES:
+        cases[f"rank.{count}"] = (rank_case, count)
+    for count in SIZES:
+        cases[f"ingest.{count}"] = (ingest_case, count)
+    for count in SIZES:
+        cases[f"create_html.{count}"] = (html_case, count)
+    cases[f"frames.{SIZES[1]}"] = (frames_case, SIZES[1])
+    for name in ('poster', 'list', 'final', 'page', 'frames', 'carousel'):
+        cases[f"render.{name}"] = (render_case, name)
+    return cases
+
+
+def percentile(samples, fraction):
+    # Nearest-rank percentile of sorted samples
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, repeat, budget, warmup=1):
+    setup, *args = case_table()[name]
+    try:
+        fn, items, *prepare = setup(*args)
+    except Skip as e:
+        return {'skipped': str(e)}
+    # A case may return a third callable that builds fn's argument, untimed, before every call
+    prepare = prepare[0] if prepare else None
+    for _ in range(warmup):
+        fn(prepare()) if prepare else fn()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (len(samples) < MIN_SAMPLES or time.perf_counter() < deadline):
+        state = prepare() if prepare else None
+        start = time.perf_counter()
+        fn(state) if prepare else fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    mean = sum(samples) / len(samples)
+    samples.sort()
+    return {
+        'items': items,
+        'samples': len(samples),
+        'p50_ms': percentile(samples, 0.5),
+        'p95_ms': percentile(samples, 0.95),
+        'mean_ms': mean,
+        'throughput': items / (mean / 1000),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(name, repeat, budget):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--case", name, "--repeat", str(repeat), "--budget", str(budget)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["exit code %d" % result.returncode])[-1]
+        return {'error': error}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def machine():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(result, baseline, tolerance, rss_tolerance):
+    # Verdict for one case against its baseline entry
+    if 'error' in result:
+        return "ERROR", False
+    if 'skipped' in result:
+        return "skipped", True
+    if baseline is None:
+        return "new", True
+    problems = []
+    delta = result['p50_ms'] - baseline['p50_ms']
+    change = delta / baseline['p50_ms'] if baseline['p50_ms'] else 0
+    if change > tolerance and delta > MIN_DELTA_MS:
+        problems.append(f"p50 {change:+.0%}")
+    if result['peak_rss_mb'] and baseline.get('peak_rss_mb'):
+        rss_change = result['peak_rss_mb'] / baseline['peak_rss_mb'] - 1
+        if rss_change > rss_tolerance:
+            problems.append(f"RSS {rss_change:+.0%}")
+    if problems:
+        return f"REGRESSED ({', '.join(problems)})", False
+    if change > tolerance:
+        return f"ok ({change:+.0%}, under {MIN_DELTA_MS} ms)", True
+    return f"ok ({change:+.0%})", True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the generation stages against a baseline.")
+    parser.add_argument("--filter", action="append", default=[], help="only run cases starting with this prefix")
+    parser.add_argument("--repeat", type=int, default=30, help="samples per case (default 30)")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds of sampling per case (default 5)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50 growth (default 0.5)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.2, help="allowed peak RSS growth (default 0.2)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.repeat, args.budget)))
+        return 0
+
+    names = [name for name in case_table() if not args.filter or name.startswith(tuple(args.filter))]
+    baseline = {'cases': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != machine() and not args.save_baseline:
+            print(f"note: baseline was recorded on {baseline.get('machine')}; timings may not be comparable",
+                  file=sys.stderr)
+
+    print(f"{'case':<22}{'items':>7}{'p50 ms':>10}{'p95 ms':>10}{'items/s':>12}{'RSS MB':>8}  vs baseline")
+    results = {}
+    failures = 0
+    for name in names:
+        result = results[name] = run_isolated(name, args.repeat, args.budget)
+        verdict, ok = compare(result, baseline['cases'].get(name), args.tolerance, args.rss_tolerance)
+        failures += not ok
+        if 'p50_ms' in result:
+            rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] else "-"
+            print(f"{name:<22}{result['items']:>7}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                  f"{result['throughput']:>12,.0f}{rss:>8}  {verdict}")
+        else:
+            print(f"{name:<22}{'':>47}  {verdict}: {result.get('skipped') or result.get('error')}")
+
+    measured = {name: result for name, result in results.items() if 'p50_ms' in result}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'machine': machine(), 'cases': results}, f, indent=2)
+    if args.save_baseline:
+        # Keep entries for cases that were filtered out or skipped this time
+        cases = dict(baseline['cases'], **measured)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({'machine': machine(), 'cases': dict(sorted(cases.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline} ({len(measured)} cases)", file=sys.stderr)
+        return 0
+    if failures:
+        print(f"FAILED: {failures} case(s) regressed or errored", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import random
+
+# Synthetic Google Maps "Nearby" pastes for benchmarks.
+#
+# Locales follow how Maps formats a listing in that language: "id" writes
+# 4,7(1.234) with Indonesian opening hours, "en" writes 4.7(1,234) with
+# English ones. About half the listings carry a "· $$" price marker after
+# the review count, which moves the address to the next detail line.
+
+NAMES = ["Kopi", "Kedai", "Warung", "Cafe", "Roti", "Bakso", "Sate", "Mie", "Teh", "Dapur"]
+SUFFIXES = ["Kenangan", "Nusantara", "Senja", "Pagi", "Bahagia", "Sederhana", "Legenda", "Rasa"]
+STREETS = ["Jl. Braga", "Jl. Dago", "Jl. Riau", "Jl. Cihampelas", "Jl. Asia Afrika", "Jl. Setiabudi"]
+PRICES = ["$", "$$", "$$$"]
+
+LOCALES = {
+    'id': {
+        'decimal': ',',
+        'thousands': '.',
+        'categories': ["Kafe", "Kedai Kopi", "Restoran", "Toko Roti"],
+        'hours': "Buka · Tutup pukul 22.00",
+        'services': "Makan di tempat · Bawa pulang",
+    },
+    'en': {
+        'decimal': '.',
+        'thousands': ',',
+        'categories': ["Cafe", "Coffee shop", "Restaurant", "Bakery"],
+        'hours': "Open · Closes 10 PM",
+        'services': "Dine-in · Takeaway",
+    },
+}
+
+
+def listing(rng, index, locale='id'):
+    conventions = LOCALES[locale]
+    name = f"{rng.choice(NAMES)} {rng.choice(SUFFIXES)} {index}"
+    rating = f"{rng.uniform(3.5, 5.0):.1f}".replace('.', conventions['decimal'])
+    reviews = rng.randint(1, 25000)
+    reviews = f"{reviews:,}".replace(',', conventions['thousands'])
+    address = f"{rng.choice(STREETS)} No.{rng.randint(1, 300)}"
+    # Price markers follow the rating; the category and address come next
+    price = f" · {rng.choice(PRICES)}" if rng.random() < 0.5 else ""
+    detail = f"{rng.choice(conventions['categories'])} · {address}"
+    return f"{name}\n{rating}({reviews}){price}\n{detail}\n{conventions['hours']}\n{conventions['services']}"
+
+
+def generate_paste(count, seed=0, locale='id'):
+    rng = random.Random(seed)
+    return "\n\n".join(listing(rng, i, locale) for i in range(count)) + "\n"
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from top10places.batch import file_names, slug
+
+# Batch output names come from manifest fields, so they must stay inside the
+# output directory and must not collide.
+
+
+def job(place_type, area, top_n=10):
+    return {'place_type': place_type, 'area': area, 'top_n': top_n}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bandung", "Bandung"),
+    ("Kopi Kenangan", "Kopi_Kenangan"),
+    ("São Paulo", "São_Paulo"),
+    ("../x", "x"),
+    ("a/b\\c", "a_b_c"),
+    ("..", "untitled"),
+    ("", "untitled"),
+    ("/etc/passwd", "etc_passwd"),
+])
+def test_slug(text, expected):
+    assert slug(text) == expected
+
+
+def test_names_stay_in_the_output_directory():
+    for name in file_names([job("../../x", "a/b"), job("..", "/"), job("Cafe", "C:\\temp")]):
+        assert os.path.basename(name) == name
+        assert os.path.normpath(os.path.join("out", name)).startswith("out" + os.sep)
+
+
+def test_repeated_jobs_get_numbered_names():
+    names = file_names([job("Cafe", "Bandung"), job("Cafe", "Bandung"), job("cafe", "bandung"),
+                        job("Cafe", "Bandung", 5)])
+    assert names == [
+        "top_10_Cafe_Bandung_images.zip",
+        "top_10_Cafe_Bandung_images_2.zip",
+        "top_10_cafe_bandung_images_3.zip",
+        "top_5_Cafe_Bandung_images.zip",
+    ]
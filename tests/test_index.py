@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from top10places import PlaceIndex, rank
+
+# PlaceIndex keeps its rankings current from the rows each paste changes
+# instead of re-ranking; after every paste they must equal a from-scratch
+# rank() of the merged places.
+
+CONFIGS = [
+    pytest.param(10, 'reviews', {}, id="reviews"),
+    pytest.param(10, 'reviews', {'min_reviews': 50}, id="reviews-min_reviews"),
+    pytest.param(10, 'bayesian', {}, id="bayesian"),
+    pytest.param(10, 'bayesian', {'min_reviews': 50}, id="bayesian-min_reviews"),
+    pytest.param(1, 'reviews', {}, id="reviews-top1"),
+    pytest.param(500, 'reviews', {}, id="reviews-more_than_places"),
+]
+
+
+def paste(places):
+    return "\n\n".join(
+        f"{name}\n{rating:.1f}({reviews:,})\nKafe · {address}".replace('.', ',', 1)
+        for name, rating, reviews, address in places
+    ) + "\n"
+
+
+def scrolls(seed, count=300, chunks=40):
+    # Overlapping windows over a fixed set of places, with review counts and
+    # ratings that go up and down between pastes, few distinct review counts
+    # (so ties are common), exact repeats and respelled names
+    rng = random.Random(seed)
+    places = [[f"Kopi {i}", 4.0, rng.choice([5, 50, 120, 999]), f"Jl. Braga No.{i}"] for i in range(count)]
+    for _ in range(chunks):
+        start = rng.randrange(count)
+        window = places[start:start + rng.randint(1, 60)]
+        for place in window:
+            if rng.random() < 0.3:
+                place[1] = rng.choice([3.5, 4.0, 4.2, 4.7, 5.0])
+                place[2] = max(0, place[2] + rng.choice([-100, -1, 0, 1, 100, 5000]))
+        chunk = [tuple(place) for place in window]
+        if rng.random() < 0.3:
+            chunk = [(name.upper() + "  ", *rest) for name, *rest in chunk]
+        yield paste(chunk)
+        if rng.random() < 0.2:
+            # The same scroll pasted again
+            yield paste(chunk)
+
+
+def from_scratch(index, top_n, strategy, options):
+    # A plain Places copy, so rank() cannot use the index's rankings
+    return rank(index.take(range(len(index))), top_n, strategy, **options)
+
+
+@pytest.mark.parametrize("top_n, strategy, options", CONFIGS)
+@pytest.mark.parametrize("seed", range(5))
+def test_ranking_matches_rank_from_scratch(seed, top_n, strategy, options):
+    index = PlaceIndex()
+    index.ranking(top_n, strategy, **options)
+    for text in scrolls(seed):
+        index.ingest(text)
+        expected = from_scratch(index, top_n, strategy, options)
+        actual = index.ranking(top_n, strategy, **options)
+        assert list(actual['places']) == list(expected['places'])
+        assert actual['most_reviews'] == expected['most_reviews']
+        assert actual['highest_rating'] == expected['highest_rating']
+
+
+def test_rank_of_an_index_uses_its_ranking():
+    index = PlaceIndex()
+    index.ingest(paste([("Kopi 1", 4.5, 10, "Jl. A"), ("Kopi 2", 4.0, 20, "Jl. B")]))
+    assert rank(index, 1) is index.ranking(1)
+    assert [place['name'] for place in rank(index, 2)['places']] == ["Kopi 1", "Kopi 2"]
+
+
+def test_ingest_deduplicates_overlapping_pastes():
+    index = PlaceIndex()
+    first = [("Kopi 1", 4.5, 10, "Jl. A"), ("Kopi 2", 4.0, 20, "Jl. B")]
+    second = [("Kopi 1", 4.5, 10, "Jl. A"), ("KOPI  2", 4.1, 25, "jl. b"), ("Kopi 3", 3.9, 5, "Jl. C")]
+    assert index.ingest(paste(first)) == {'parsed': 2, 'added': 2, 'updated': 0, 'unchanged': 0}
+    assert index.ingest(paste(second)) == {'parsed': 3, 'added': 1, 'updated': 1, 'unchanged': 1}
+    revision = index.revision
+    assert index.ingest(paste(second)) == {'parsed': 3, 'added': 0, 'updated': 0, 'unchanged': 3}
+    assert index.revision == revision
+    assert len(index) == 3
+    # The latest paste decides the spelling
+    assert index[1] == {'name': "KOPI  2", 'rating': 4.1, 'reviews': 25, 'address': "jl. b"}
@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from top10places.encoding import encode_image
+from top10places.instagram import Client, MockInstagram
+
+# The Instagram client against the local mock: the saved session is reused,
+# carousels are published whole, and rate-limited steps are retried.
+
+
+@pytest.fixture
+def images():
+    return [encode_image(Image.new('RGB', (600, 800), color), 'png') for color in ('white', 'gray', 'black')]
+
+
+@pytest.fixture
+def mock():
+    # Every path answers its first request with 429
+    mock = MockInstagram(rate_limit=1)
+    mock.base_url = mock.start()
+    yield mock
+    mock.stop()
+
+
+def client(mock, session_dir):
+    return Client('demo', 'secret', base_url=mock.base_url, session_dir=str(session_dir), backoff=0.01)
+
+
+def test_second_upload_reuses_the_saved_session(mock, images, tmp_path):
+    for run in (1, 2):
+        client(mock, tmp_path).upload_carousel(images, caption=f"run {run}")
+    assert mock.logins == 1
+    assert len(mock.posts) == 2
+    assert [post['caption'] for post in mock.posts] == ["run 1", "run 2"]
+    assert all(len(post['children']) == 3 for post in mock.posts)
+    assert len(mock.uploads) == 6
+
+
+def test_rate_limited_steps_are_retried(mock, images, tmp_path):
+    result = client(mock, tmp_path).upload_carousel(images)
+    steps = {metric['step']: metric for metric in result['metrics']}
+    assert result['code'] == "MOCK1"
+    for step in ('login', 'configure'):
+        assert steps[step]['attempts'] == 2
+        assert steps[step]['status'] == 200
+    # The uploads share one path, so only the first of them is limited
+    assert sorted(steps[f"upload {i}"]['attempts'] for i in (1, 2, 3)) == [1, 1, 2]
+    assert mock.requests.count('/api/v1/media/configure_sidecar/') == 2
+
+
+def test_metrics_belong_to_each_call(mock, images, tmp_path):
+    uploader = client(mock, tmp_path)
+    first = uploader.upload_carousel(images)
+    second = uploader.upload_carousel(images)
+    assert [metric['step'] for metric in first['metrics']][:2] == ['login', 'prepare']
+    assert 'login' not in [metric['step'] for metric in second['metrics']]
+    assert first['metrics'] is not second['metrics']
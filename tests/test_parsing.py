@@ -0,0 +1,100 @@
+import io
+import random
+import re
+
+import pytest
+
+from top10places import extract_address, iter_records, parse_text
+
+# The line-oriented parser must read a paste exactly as the original
+# whole-text regex did, and must not turn malformed lines into places.
+
+
+def legacy_parse_text(text):
+    # The parser app.py shipped with, kept as the reference
+    places = []
+    pattern = r'(.*?)\n(\d+[,\.]\d+)\((\d+(?:\.\d+)?)\)(.*?)(?=\n\n|\Z)'
+    for match in re.findall(pattern, text, re.DOTALL):
+        lines = match[0].strip().split('\n')
+        places.append({
+            'name': lines[-1] if lines else "",
+            'rating': float(match[1].replace(',', '.')),
+            'reviews': int(float(match[2].replace('.', '').replace(',', ''))),
+            'address': extract_address(match[3])
+        })
+    return places
+
+
+def listing(rng, i):
+    # One Indonesian Maps listing: "4,7(1.234)", sometimes a price marker,
+    # then the category and address, hours and services
+    reviews = f"{rng.randint(1, 250000):,}".replace(',', '.')
+    price = f" · {rng.choice(['$', '$$', '$$$'])}" if rng.random() < 0.5 else ""
+    rating = f"{rng.uniform(1, 5):.1f}".replace('.', ',')
+    return (f"Kopi {rng.choice(['Senja', 'Pagi', 'Rasa'])} {i}\n{rating}({reviews}){price}\n"
+            f"Kafe · Jl. Braga No.{rng.randint(1, 300)}\nBuka · Tutup pukul 22.00\nMakan di tempat · Bawa pulang")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_regex(seed):
+    rng = random.Random(seed)
+    # A header before the first listing and blocks without ratings after the last
+    text = "Hasil\n\n" + "\n\n".join(listing(rng, i) for i in range(200))
+    text += "\n\nHasil lainnya\n\n" + "\n\n".join(f"Iklan {i}" for i in range(50))
+    assert list(parse_text(text)) == legacy_parse_text(text)
+
+
+@pytest.mark.parametrize("text", [
+    pytest.param("Kopi A\n4,5(10)\nKafe · Jl. A\n", id="trailing_newline"),
+    pytest.param("Kopi A\n4,5(10)\nKafe · Jl. A", id="no_trailing_newline"),
+    pytest.param("Iklan\nKopi A\n4,5(1.234) · $$\nKafe · Jl. A\nBuka\n\nKopi B\n3,9(7)\nJl. B\n", id="price_marker"),
+    pytest.param("Kopi A\n4,5(10)", id="no_details"),
+    pytest.param("Kopi A\n4.5(10)\nJl. A\n", id="decimal_point"),
+    pytest.param("Kopi A\r\n4,5(10)\r\nKafe · Jl. A\r\n\r\nKopi B\r\n3,9(7)\r\nJl. B\r\n", id="crlf"),
+])
+def test_edge_cases_match_legacy_regex(text):
+    assert list(parse_text(text)) == legacy_parse_text(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Dot thousands (Indonesian) and comma thousands (English), as Maps writes them
+    ("Kopi A\n4,7(1.234)\nKafe · Jl. A\n", [("Kopi A", 4.7, 1234, "Jl. A")]),
+    ("Kopi A\n4.7(1,234)\nCafe · Jl. A\n", [("Kopi A", 4.7, 1234, "Jl. A")]),
+    ("Kopi A\n4.7(1,234,567)\nCafe · Jl. A\n", [("Kopi A", 4.7, 1234567, "Jl. A")]),
+    ("Kopi A\n4,7(1.234.567)\nKafe · Jl. A\n", [("Kopi A", 4.7, 1234567, "Jl. A")]),
+    ("Kopi A\n4,7(87)\nKafe · Jl. A\n", [("Kopi A", 4.7, 87, "Jl. A")]),
+    ("Kopi A\n4,7(12345)\nKafe · Jl. A\n", [("Kopi A", 4.7, 12345, "Jl. A")]),
+])
+def test_thousands_separators(text, expected):
+    assert list(iter_records(text)) == expected
+
+
+@pytest.mark.parametrize("line", [
+    pytest.param("4,5(1,2)", id="short_group"),
+    pytest.param("4,5(12.5)", id="decimal_count"),
+    pytest.param("4,5(1.2345)", id="long_group"),
+    pytest.param("4,5(1,2 rb)", id="abbreviated_count"),
+    pytest.param("4,5 (10)", id="space_before_count"),
+    pytest.param("4(10)", id="integer_rating"),
+    pytest.param("4,5()", id="empty_count"),
+    pytest.param("(10)", id="no_rating"),
+])
+def test_malformed_rating_lines_are_not_places(line):
+    assert list(iter_records(f"Kopi A\n{line}\nKafe · Jl. A\n")) == []
+
+
+def test_rating_on_the_first_line_has_no_name_and_is_skipped():
+    assert list(iter_records("4,5(10)\nKafe · Jl. A\n")) == []
+
+
+def test_empty_paste():
+    assert list(iter_records("")) == []
+    assert len(parse_text("")) == 0
+
+
+def test_streams_and_line_endings():
+    text = "Kopi A\n4,5(10)\nKafe · Jl. A\n\nKopi B\n3,9(7)\nJl. B\n"
+    expected = [("Kopi A", 4.5, 10, "Jl. A"), ("Kopi B", 3.9, 7, "Jl. B")]
+    assert list(iter_records(text)) == expected
+    assert list(iter_records(io.StringIO(text))) == expected
+    assert list(iter_records(text.splitlines(keepends=True))) == expected
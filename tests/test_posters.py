@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from top10places import posters
+
+# The native posters must stay within 1% of the pixels Chromium renders for
+# the same HTML. Needs the Inter assets and Chromium; skipped without either.
+
+THRESHOLD = 0.01
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    if not posters.available():
+        pytest.skip("Inter assets are not built (python -m top10places.assets build)")
+    from top10places.renderer import get_renderer
+
+    renderer = get_renderer()
+    try:
+        renderer.warm(timeout=60)
+    except Exception as e:
+        pytest.skip(f"Chromium unavailable ({type(e).__name__})")
+    return renderer
+
+
+@pytest.mark.parametrize("draw, html_content", [
+    pytest.param(draw, html_content, id=name.replace(" ", "_")) for name, draw, html_content in posters.cases()
+])
+def test_native_poster_matches_chromium(renderer, draw, html_content):
+    diff = posters.pixel_diff(draw(), posters.reference(html_content))
+    assert diff <= THRESHOLD, f"{diff:.2%} of pixels differ"
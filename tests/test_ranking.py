@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from top10places import Places, rank
+from top10places.ranking import BayesianStrategy
+
+# Heap-based rank() must pick and order places exactly as the original
+# double sort did, ties and short lists included, whether it is given a
+# list of dicts or a Places container.
+
+
+def legacy_rank(places, top_n):
+    # The ranking app.py shipped with, kept as the reference
+    top_places = sorted(places, key=lambda x: x['reviews'], reverse=True)[:top_n]
+    top_places = sorted(top_places, key=lambda x: x['rating'], reverse=True)
+    most_reviews = max(top_places, key=lambda x: x['reviews'])['reviews']
+    highest_rating = max(top_places, key=lambda x: x['rating'])['rating']
+    return top_places, most_reviews, highest_rating
+
+
+def generate(seed, count):
+    # Few distinct ratings and review counts, so most comparisons are ties
+    rng = random.Random(seed)
+    return list(Places.from_places(
+        {'name': f"Kopi {i}", 'rating': rng.choice([3.9, 4.2, 4.5, 5.0]),
+         'reviews': rng.choice([3, 10, 250, 1000]), 'address': f"Jl. Braga No.{i}"}
+        for i in range(count)
+    ))
+
+
+def as_tuple(result):
+    return list(result['places']), result['most_reviews'], result['highest_rating']
+
+
+@pytest.mark.parametrize("count, top_n", [(1, 10), (7, 10), (10, 10), (50, 10), (500, 10), (500, 1), (500, 600)])
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_double_sort(seed, count, top_n):
+    places = generate(seed, count)
+    expected = legacy_rank(places, top_n)
+    assert as_tuple(rank(places, top_n)) == expected
+    assert as_tuple(rank(iter(places), top_n)) == expected
+    assert as_tuple(rank(Places.from_places(places), top_n)) == expected
+
+
+def test_ties_keep_input_order():
+    places = [{'name': name, 'rating': 4.5, 'reviews': 10, 'address': ""} for name in "ABCDE"]
+    assert [place['name'] for place in rank(places, 3)['places']] == ["A", "B", "C"]
+    assert [place['name'] for place in rank(Places.from_places(places), 3)['places']] == ["A", "B", "C"]
+
+
+def test_empty():
+    assert as_tuple(rank([], 10)) == ([], 0, 0)
+    assert as_tuple(rank(Places(), 10)) == ([], 0, 0)
+
+
+@pytest.mark.parametrize("top_n", [1, 10, 600])
+def test_min_reviews_filters_before_selecting(top_n):
+    places = generate(0, 500)
+    expected = legacy_rank([place for place in places if place['reviews'] >= 250], top_n)
+    assert as_tuple(rank(places, top_n, min_reviews=250)) == expected
+    assert as_tuple(rank(Places.from_places(places), top_n, min_reviews=250)) == expected
+
+
+@pytest.mark.parametrize("top_n", [1, 10, 600])
+def test_bayesian_matches_sorting_by_score(top_n):
+    places = generate(1, 500)
+    score = BayesianStrategy().score
+    expected = sorted(places, key=score, reverse=True)[:top_n]
+    expected.sort(key=score, reverse=True)
+    assert list(rank(places, top_n, 'bayesian')['places']) == expected
+    assert list(rank(Places.from_places(places), top_n, 'bayesian')['places']) == expected
@@ -0,0 +1,83 @@
+import os
+
+from top10places.render_cache import RenderCache, make_key
+
+# The two cache tiers: a memory LRU bounded in bytes and a disk directory
+# bounded in total size, where half-written and corrupt files never count.
+
+
+def key(n):
+    return make_key(f"<p>{n}</p>", {'width': 600, 'height': 800}, 1)
+
+
+def test_memory_evicts_least_recently_used():
+    cache = RenderCache(directory=None, memory_bytes=300)
+    for n in range(3):
+        cache.put(key(n), b"x" * 100, {'n': n})
+    assert cache.get(key(0)) == (b"x" * 100, {'n': 0})
+    cache.put(key(3), b"y" * 100)
+    assert cache.get(key(1)) is None
+    assert cache.get(key(0)) is not None
+    assert cache.get(key(3)) == (b"y" * 100, {})
+    assert cache.stats()['memory_bytes'] == 300
+    assert cache.stats()['memory_entries'] == 3
+
+
+def test_entries_larger_than_memory_skip_it():
+    cache = RenderCache(directory=None, memory_bytes=100)
+    cache.put(key(0), b"x" * 101)
+    assert cache.get(key(0)) is None
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_disk_serves_entries_memory_dropped(tmp_path):
+    cache = RenderCache(directory=str(tmp_path), memory_bytes=0)
+    cache.put(key(0), b"png", {'height': 800})
+    assert cache.get(key(0)) == (b"png", {'height': 800})
+    assert cache.stats()['disk_hits'] == 1
+    # A new process finds the entries and their size
+    reopened = RenderCache(directory=str(tmp_path), memory_bytes=0)
+    assert reopened.get(key(0)) == (b"png", {'height': 800})
+    assert reopened.stats()['disk_bytes'] == cache.stats()['disk_bytes']
+
+
+def test_disk_evicts_least_recently_used_past_the_cap(tmp_path):
+    cache = RenderCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=350)
+    for n in range(3):
+        cache.put(key(n), b"x" * 100)
+        # Eviction goes by mtime; space the entries out explicitly
+        os.utime(tmp_path / key(n), (n, n))
+    cache.get(key(0))
+    os.utime(tmp_path / key(0), (10, 10))
+    cache.put(key(3), b"x" * 100)
+    assert sorted(os.listdir(tmp_path)) == sorted([key(0), key(2), key(3)])
+    assert cache.get(key(1)) is None
+    assert cache.stats()['disk_bytes'] <= 350
+    assert cache.stats()['disk_bytes'] == sum(entry.stat().st_size for entry in os.scandir(tmp_path))
+
+
+def test_tmp_files_are_neither_counted_nor_evicted(tmp_path):
+    # A write in flight in another process, older than every entry
+    pending = tmp_path / f"{key(9)}.1234.tmp"
+    pending.write_bytes(b"z" * 1000)
+    os.utime(pending, (0, 0))
+    cache = RenderCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=250)
+    assert cache.stats()['disk_bytes'] == 0
+    for n in range(3):
+        cache.put(key(n), b"x" * 100)
+    assert pending.exists()
+    assert cache.get(key(2)) is not None
+
+
+def test_corrupt_entries_are_misses_and_removed(tmp_path):
+    blobs = [b"{not json\npng", b"\xff\xfe\npng", b"no header line", b""]
+    for n, blob in enumerate(blobs):
+        (tmp_path / key(n)).write_bytes(blob)
+    cache = RenderCache(directory=str(tmp_path), memory_bytes=0)
+    for n in range(len(blobs)):
+        assert cache.get(key(n)) is None
+        assert not (tmp_path / key(n)).exists()
+    assert cache.stats()['misses'] == 4
+    assert cache.stats()['disk_bytes'] == 0
+    cache.put(key(0), b"png")
+    assert cache.get(key(0)) == (b"png", {})
@@ -0,0 +1,60 @@
+import importlib
+
+# Lean core for "Top N places" carousels: parse a Google Maps paste, rank the
+# places, build the HTML frames, rasterise them and archive the result.
+#
+# Importing the package only loads the parsing, ranking and HTML modules.
+# Rendering (asyncio, Playwright, Pillow) and provisioning load on first
+# attribute access, as does the Instagram uploader (instagram); the Streamlit
+# UI (app.py) is never imported.
+
+from .archive import create_zip, write_zip, zip_entries, zip_file_name
+from .artifacts import ImageArtifact, as_artifact
+from .charts import render_scatter, scatter_svg
+from .encoding import PRESETS, encode, encode_image, get_preset
+from .encoding import summary as encoding_summary
+from .index import PlaceIndex
+from .memo import Memo, digest
+from .pages import (
+    ASPECTS,
+    carousel_frames,
+    chart_frame,
+    create_final_poster_html,
+    create_html,
+    create_poster_html,
+    create_scatter_plot_html,
+    final_poster_frame,
+    list_frame,
+    page_html,
+    poster_frame,
+)
+from .parsing import extract_address, iter_places, iter_records, parse_text
+from .places import Places
+from .ranking import STRATEGIES, rank
+from .templating import DEFAULT_THEME, available_themes
+
+_LAZY = {
+    'capture_frames': 'render',
+    'capture_frames_async': 'render',
+    'create_carousel_images': 'render',
+    'create_carousel_images_async': 'render',
+    'create_final_poster_image': 'render',
+    'create_final_poster_image_async': 'render',
+    'create_poster_image': 'render',
+    'create_poster_image_async': 'render',
+    'html_to_image': 'render',
+    'html_to_image_top10': 'render',
+    'html_to_image_top10_async': 'render',
+    'get_job_queue': 'jobs',
+    'get_renderer': 'renderer',
+    'instagram': None,
+    'provision': None,
+    'tracing': None,
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY[name] or name}", __name__)
+    return module if _LAZY[name] is None else getattr(module, name)
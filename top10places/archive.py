@@ -0,0 +1,47 @@
+import io
+import zipfile
+
+from . import tracing
+from .artifacts import as_artifact
+
+# ZIP archive of a carousel. Images are written as they were encoded; PNG,
+# JPEG and WebP are already compressed, so they are stored rather than
+# deflated again.
+
+
+def zip_file_name(top_n, place_type, area):
+    return f"top_{top_n}_{place_type}_{area}_images.zip"
+
+
+def zip_entries(images, top_n, chart=False):
+    # (name, artifact) pairs for a carousel: poster, list frame(s), the chart
+    # with ``chart``, final poster. A list split over several frames is
+    # numbered top_10_1, top_10_2, ...
+    images = [as_artifact(image) for image in images]
+    poster, lists, final = images[0], images[1:-1], images[-1]
+    if chart:
+        *lists, chart = lists
+    entries = [(f"poster.{poster.extension}", poster)]
+    for i, image in enumerate(lists, 1):
+        suffix = f"_{i}" if len(lists) > 1 else ""
+        entries.append((f"top_{top_n}{suffix}.{image.extension}", image))
+    if chart:
+        entries.append((f"chart.{chart.extension}", chart))
+    entries.append((f"final_poster.{final.extension}", final))
+    return entries
+
+
+def write_zip(fp, entries):
+    # Stream the archive into ``fp``; it does not need to be seekable, so a
+    # file, stdout or an HTTP response body all work
+    with tracing.span("zip", count=len(entries), bytes=sum(len(artifact) for _, artifact in entries)):
+        with zipfile.ZipFile(fp, 'w', zipfile.ZIP_DEFLATED, False) as zip_file:
+            for name, artifact in entries:
+                compress_type = zipfile.ZIP_STORED if artifact.compressed else zipfile.ZIP_DEFLATED
+                zip_file.writestr(name, artifact.data, compress_type=compress_type)
+
+
+def create_zip(poster_image, html_image, final_poster_image, top_n):
+    with io.BytesIO() as zip_buffer:
+        write_zip(zip_buffer, zip_entries([poster_image, html_image, final_poster_image], top_n))
+        return zip_buffer.getvalue()
@@ -0,0 +1,79 @@
+import io
+
+# Encoded images passed between the renderer, the UI and the archive.
+#
+# An ImageArtifact keeps the bytes exactly as they were encoded (Chromium's
+# screenshot, a render cache entry, a native poster encoded once) and only
+# decodes them with Pillow when pixels are actually needed. Writing one to a
+# ZIP, a file or st.image never re-encodes it. Pickling (render workers)
+# carries the bytes only.
+
+MIME_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+# Formats that are already compressed and gain nothing from ZIP deflate
+COMPRESSED_FORMATS = frozenset(MIME_TYPES)
+
+
+class ImageArtifact:
+    __slots__ = ('data', 'format', 'stats', '_image')
+
+    def __init__(self, data, format='png', image=None, stats=None):
+        self.data = data
+        self.format = format
+        # Encoding report, see encoding.py
+        self.stats = stats
+        self._image = image
+
+    @classmethod
+    def from_image(cls, image, format='png', **options):
+        # Encode a PIL image once; the image itself is kept for display
+        buffer = io.BytesIO()
+        image.save(buffer, format=format.upper(), **options)
+        return cls(buffer.getvalue(), format, image)
+
+    @property
+    def image(self):
+        if self._image is None:
+            from PIL import Image
+
+            self._image = Image.open(io.BytesIO(self.data))
+        return self._image
+
+    @property
+    def size(self):
+        # Image.open only reads the header, so this does not decode pixels
+        return self.image.size
+
+    @property
+    def extension(self):
+        return 'jpg' if self.format == 'jpeg' else self.format
+
+    @property
+    def mimetype(self):
+        return MIME_TYPES.get(self.format, 'application/octet-stream')
+
+    @property
+    def compressed(self):
+        return self.format in COMPRESSED_FORMATS
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __reduce__(self):
+        return (ImageArtifact, (self.data, self.format, None, self.stats))
+
+    def __repr__(self):
+        return f"ImageArtifact({self.format}, {len(self.data)} bytes)"
+
+
+def as_artifact(value):
+    # Accept an artifact, encoded PNG bytes or a PIL image
+    if isinstance(value, ImageArtifact):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return ImageArtifact(bytes(value))
+    return ImageArtifact.from_image(value)
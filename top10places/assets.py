@@ -0,0 +1,217 @@
+import base64
+import functools
+import io
+import logging
+import os
+import re
+import zipfile
+
+# Local copies of the fonts and scripts the templates would otherwise fetch
+# from Google Fonts and cdnjs during every headless render.
+#
+# The subset fonts are committed in ASSET_DIR (with their OFL licenses).
+# ``python -m top10places.assets build`` rebuilds them: it downloads the
+# upstream files, or takes local copies (--inter DIR_OR_ZIP, --font-awesome
+# FILE), and subsets the fonts to the glyphs the posters use. At render time
+# the renderer intercepts the CDN URLs and answers them from memory. An asset
+# that is missing is fetched from the network as before; that is logged once
+# and shows in status() and the renderer's health().
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+INTER_WEIGHTS = {400: "Regular", 600: "SemiBold", 700: "Bold"}
+INTER_ZIP_URL = "https://github.com/rsms/inter/releases/download/v4.0/Inter-4.0.zip"
+FONT_AWESOME_URL = "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/webfonts/fa-solid-900.ttf"
+
+# Latin, Latin-1 and Latin Extended-A plus the punctuation used in the
+# templates (•, ·, ★, quotes, dashes). Anything else falls back to sans-serif.
+INTER_UNICODES = (
+    list(range(0x20, 0x7F))
+    + list(range(0xA0, 0x180))
+    + [0x2013, 0x2014, 0x2018, 0x2019, 0x201C, 0x201D, 0x2022, 0x2026, 0x20AC, 0x2605]
+)
+
+# Font Awesome icons referenced by the templates, by class name
+FONT_AWESOME_ICONS = {
+    'map-marker-alt': 0xF3C5,
+}
+
+logger = logging.getLogger(__name__)
+# Hosts whose network fallback has been logged already
+_warned = set()
+
+ROUTE_PATTERN = re.compile(r"^https://(fonts\.googleapis\.com|fonts\.gstatic\.com|cdnjs\.cloudflare\.com)/")
+
+
+def inter_path(weight):
+    return os.path.join(ASSET_DIR, f"inter-{weight}.ttf")
+
+
+def font_awesome_path():
+    return os.path.join(ASSET_DIR, "fa-solid-900.ttf")
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _font_face(family, weight, data):
+    encoded = base64.b64encode(data).decode("ascii")
+    return (
+        f"@font-face{{font-family:'{family}';font-style:normal;font-weight:{weight};"
+        f"font-display:block;src:url(data:font/ttf;base64,{encoded}) format('truetype');}}\n"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def inter_css():
+    faces = []
+    for weight in INTER_WEIGHTS:
+        data = _read(inter_path(weight))
+        if data is None:
+            return None
+        faces.append(_font_face("Inter", weight, data))
+    return "".join(faces)
+
+
+@functools.lru_cache(maxsize=None)
+def font_awesome_css():
+    data = _read(font_awesome_path())
+    if data is None:
+        return None
+    css = [
+        _font_face("Font Awesome 6 Free", 900, data),
+        ".fa,.fas,.fa-solid{font-family:'Font Awesome 6 Free';font-weight:900;display:inline-block;"
+        "font-style:normal;font-variant:normal;line-height:1;text-rendering:auto;"
+        "-webkit-font-smoothing:antialiased;}\n",
+    ]
+    for name, codepoint in FONT_AWESOME_ICONS.items():
+        css.append(f'.fa-{name}::before{{content:"\\{codepoint:x}";}}\n')
+    return "".join(css)
+
+
+def status():
+    # Which local assets are available; missing ones come from the network
+    return {
+        'inter': all(os.path.exists(inter_path(weight)) for weight in INTER_WEIGHTS),
+        'font_awesome': os.path.exists(font_awesome_path()),
+    }
+
+
+def lookup(url):
+    # CDN URLs the templates reference, mapped to the asset that replaces
+    # them: (body, content_type), or None to use the network
+    if url.startswith("https://fonts.googleapis.com/css"):
+        body, content_type = inter_css(), "text/css"
+    elif url.startswith("https://cdnjs.cloudflare.com/ajax/libs/font-awesome/") and url.endswith(".css"):
+        body, content_type = font_awesome_css(), "text/css"
+    else:
+        return None
+    if body is None:
+        return None
+    return body, content_type
+
+
+async def route_handler(route):
+    asset = lookup(route.request.url)
+    if asset is None:
+        host = route.request.url.split("/")[2]
+        if host not in _warned:
+            _warned.add(host)
+            logger.warning("no local asset for %s; fetching it from the network "
+                           "(python -m top10places.assets build)", route.request.url)
+        await route.continue_()
+        return
+    body, content_type = asset
+    await route.fulfill(
+        status=200,
+        body=body,
+        content_type=content_type,
+        headers={'Access-Control-Allow-Origin': '*', 'Cache-Control': 'max-age=31536000'},
+    )
+
+
+# -- build ------------------------------------------------------------------
+
+
+def _download(url):
+    import requests
+
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return response.content
+
+
+def _subset(font_bytes, unicodes):
+    from fontTools import subset
+
+    options = subset.Options()
+    options.layout_features = ["kern", "liga", "calt", "tnum"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    # Always write TrueType, also from WOFF/WOFF2 sources
+    options.flavor = None
+    font = subset.load_font(io.BytesIO(font_bytes), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+def _inter_fonts(source):
+    # {style: bytes} from the release ZIP (downloaded when ``source`` is None),
+    # a local ZIP, or a directory of Inter-<Style>.ttf/.otf/.woff2 files
+    if source is None or zipfile.is_zipfile(source):
+        if source is None:
+            print(f"Fetching {INTER_ZIP_URL}")
+        with zipfile.ZipFile(io.BytesIO(_download(INTER_ZIP_URL)) if source is None else source) as archive:
+            members = {os.path.basename(name): name for name in archive.namelist()}
+            return {style: archive.read(members[f"Inter-{style}.ttf"]) for style in INTER_WEIGHTS.values()}
+    fonts = {}
+    for style in INTER_WEIGHTS.values():
+        for extension in ("ttf", "otf", "woff2", "woff"):
+            data = _read(os.path.join(source, f"Inter-{style}.{extension}"))
+            if data is not None:
+                fonts[style] = data
+                break
+        else:
+            raise FileNotFoundError(f"Inter-{style} not found in {source}")
+    return fonts
+
+
+def build(inter=None, font_awesome=None):
+    os.makedirs(ASSET_DIR, exist_ok=True)
+
+    for weight, data in zip(INTER_WEIGHTS, _inter_fonts(inter).values()):
+        subset = _subset(data, INTER_UNICODES)
+        with open(inter_path(weight), "wb") as f:
+            f.write(subset)
+        print(f"  inter-{weight}.ttf: {len(data)} -> {len(subset)} bytes")
+
+    if font_awesome is None:
+        print(f"Fetching {FONT_AWESOME_URL}")
+        data = _download(FONT_AWESOME_URL)
+    else:
+        with open(font_awesome, "rb") as f:
+            data = f.read()
+    subset = _subset(data, list(FONT_AWESOME_ICONS.values()))
+    with open(font_awesome_path(), "wb") as f:
+        f.write(subset)
+    print(f"  fa-solid-900.ttf: {len(data)} -> {len(subset)} bytes")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m top10places.assets")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--inter", help="Inter release ZIP or directory of Inter-<Style> fonts (default: download)")
+    parser.add_argument("--font-awesome", help="fa-solid-900 font file (default: download)")
+    args = parser.parse_args()
+    build(args.inter, args.font_awesome)
@@ -0,0 +1,111 @@
+import concurrent.futures
+import csv
+import json
+import os
+import re
+import time
+
+from .archive import write_zip, zip_entries, zip_file_name
+from .parsing import parse_text
+from .render import create_carousel_images
+from .renderer import get_renderer
+
+# Batch generation: render one carousel ZIP per manifest entry.
+#
+#     python -m top10places batch manifest.json --output out/ --concurrency 4
+#
+# The manifest is a JSON list of objects or a CSV with a header row, each
+# entry having area, place_type, top_n (optional, default 10) and paste, the
+# path to a file holding the pasted Google Maps text. Relative paste paths are
+# resolved against the manifest's directory. ZIPs are named after top_n,
+# place_type and area, slugged so a manifest cannot write outside the output
+# directory; entries that would share a name get _2, _3, ... appended.
+
+
+def load_manifest(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            entries = list(csv.DictReader(f))
+        else:
+            entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for entry in entries:
+        jobs.append({
+            'area': entry['area'].strip(),
+            'place_type': entry['place_type'].strip(),
+            'top_n': int(entry.get('top_n') or 10),
+            'paste': os.path.join(base, entry['paste']),
+        })
+    return jobs
+
+
+def slug(text):
+    # Word characters, '.' and '-' only, so the text is one safe path component
+    return re.sub(r'[^\w.-]+', '_', text).strip('._') or 'untitled'
+
+
+def file_name(job):
+    return zip_file_name(job['top_n'], slug(job['place_type']), slug(job['area']))
+
+
+def file_names(jobs):
+    # One output name per job, in manifest order; repeats are numbered.
+    # Compared case-insensitively, as some file systems are
+    names = []
+    taken = set()
+    for job in jobs:
+        base, ext = os.path.splitext(file_name(job))
+        name, count = base + ext, 1
+        while name.lower() in taken:
+            count += 1
+            name = f"{base}_{count}{ext}"
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def run_job(job, output_dir, preset='png', theme='classic', aspect='3:4', split=False, chart=False, name=None):
+    start = time.perf_counter()
+    area, place_type, top_n = job['area'], job['place_type'], job['top_n']
+    with open(job['paste'], encoding='utf-8') as f:
+        places = parse_text(f.read())
+    if not places:
+        raise ValueError("No valid data found in the paste.")
+
+    images = create_carousel_images(
+        place_type, area, top_n, places, preset=preset, theme=theme, aspect=aspect, split=split, chart=chart
+    )
+
+    path = os.path.join(output_dir, name or file_name(job))
+    with open(path, 'wb') as f:
+        write_zip(f, zip_entries(images, top_n, chart))
+    return path, len(places), time.perf_counter() - start
+
+
+def run_batch(jobs, output_dir, concurrency=None, preset='png', theme='classic', aspect='3:4', split=False,
+              chart=False):
+    os.makedirs(output_dir, exist_ok=True)
+    # The renderer caps open pages; running more jobs than that only queues
+    concurrency = concurrency or get_renderer().max_pages
+    failures = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(run_job, job, output_dir, preset, theme, aspect, split, chart, name): job
+            for job, name in zip(jobs, file_names(jobs))
+        }
+        for future in concurrent.futures.as_completed(futures):
+            job = futures[future]
+            label = f"{job['place_type']} / {job['area']} (top {job['top_n']})"
+            try:
+                path, count, elapsed = future.result()
+                print(f"[ok]   {label}: {count} places, {elapsed:.2f}s -> {path}")
+            except Exception as e:
+                failures += 1
+                print(f"[fail] {label}: {e}")
+    elapsed = time.perf_counter() - start
+    done = len(jobs) - failures
+    print(f"{done}/{len(jobs)} carousels in {elapsed:.2f}s "
+          f"({done / elapsed if elapsed else 0:.2f} carousels/s, concurrency {concurrency})")
+    return failures
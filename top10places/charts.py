@@ -0,0 +1,173 @@
+import html
+import math
+
+from .places import Places
+
+# Native reviews-vs-rating scatter chart.
+#
+# The chart is laid out once in Python: axis ranges padded by 10% of the
+# data span (reviews never below 0, ratings within 0..5), round tick steps,
+# and each point labelled above its marker with the name, rating and review
+# count, like Plotly's "top center" text. The layout is drawn either as SVG
+# markup (embedded in a page, no script to run) or straight into a Pillow
+# image with the poster fonts. Colours follow Plotly's default template.
+
+WIDTH = 800
+HEIGHT = 600
+MARGIN = {'top': 80, 'right': 40, 'bottom': 70, 'left': 70}
+TITLE_SIZE = 24
+AXIS_TITLE_SIZE = 14
+TICK_SIZE = 12
+LABEL_SIZE = 10
+MARKER_RADIUS = 5
+
+TEXT_COLOR = '#2A3F5F'
+PLOT_COLOR = '#E5ECF6'
+GRID_COLOR = '#FFFFFF'
+MARKER_COLOR = '#636EFA'
+FONT_FAMILY = "'Inter', sans-serif"
+
+
+def axis_range(low, high, floor=None, ceiling=None):
+    padding = (high - low) * 0.1
+    if padding == 0:
+        # A single value (or identical ones) still gets a visible axis
+        padding = abs(low) * 0.1 or 1
+    low, high = low - padding, high + padding
+    if floor is not None:
+        low = max(floor, low)
+    if ceiling is not None:
+        high = min(ceiling, high)
+    return low, high
+
+
+def ticks(low, high, target=5):
+    # Round tick values (1, 2, 2.5 or 5 times a power of ten) inside the range
+    raw = (high - low) / target
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    value = math.ceil(low / step) * step
+    values = []
+    while value <= high + step * 1e-9:
+        values.append(round(value, 10))
+        value += step
+    return values
+
+
+def tick_label(value, thousands=False):
+    if thousands and abs(value) >= 1000:
+        return f"{value / 1000:g}k"
+    return f"{value:g}"
+
+
+def scatter_layout(places, title, width=WIDTH, height=HEIGHT):
+    places = Places.from_places(places)
+    left, top = MARGIN['left'], MARGIN['top']
+    right, bottom = width - MARGIN['right'], height - MARGIN['bottom']
+    x_min, x_max = axis_range(places.min('reviews'), places.max('reviews'), floor=0)
+    y_min, y_max = axis_range(places.min('rating'), places.max('rating'), floor=0, ceiling=5)
+
+    def x(value):
+        return left + (value - x_min) / (x_max - x_min) * (right - left)
+
+    def y(value):
+        return bottom - (value - y_min) / (y_max - y_min) * (bottom - top)
+
+    points = [
+        {
+            'x': x(place['reviews']),
+            'y': y(place['rating']),
+            'label': [place['name'], f"{place['rating']} ★", f"{place['reviews']} reviews"],
+        }
+        for place in places
+    ]
+    return {
+        'title': title,
+        'width': width,
+        'height': height,
+        'plot': (left, top, right, bottom),
+        'x_ticks': [(x(value), tick_label(value, thousands=True)) for value in ticks(x_min, x_max)],
+        'y_ticks': [(y(value), tick_label(value)) for value in ticks(y_min, y_max)],
+        'points': points,
+    }
+
+
+def label_lines(point, line_height=LABEL_SIZE * 1.2):
+    # Baselines of a point's label, stacked upwards from just above the marker
+    bottom = point['y'] - MARKER_RADIUS - 3
+    count = len(point['label'])
+    return [(text, bottom - (count - 1 - i) * line_height) for i, text in enumerate(point['label'])]
+
+
+def scatter_svg(places, title, width=WIDTH, height=HEIGHT):
+    layout = scatter_layout(places, title, width, height)
+    left, top, right, bottom = layout['plot']
+    escape = html.escape
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{escape(FONT_FAMILY)}" fill="{TEXT_COLOR}">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<rect x="{left}" y="{top}" width="{right - left}" height="{bottom - top}" fill="{PLOT_COLOR}"/>',
+    ]
+    for position, text in layout['x_ticks']:
+        parts.append(f'<line x1="{position:.1f}" y1="{top}" x2="{position:.1f}" y2="{bottom}" stroke="{GRID_COLOR}"/>')
+        parts.append(f'<text x="{position:.1f}" y="{bottom + TICK_SIZE + 6}" font-size="{TICK_SIZE}" '
+                     f'text-anchor="middle">{escape(text)}</text>')
+    for position, text in layout['y_ticks']:
+        parts.append(f'<line x1="{left}" y1="{position:.1f}" x2="{right}" y2="{position:.1f}" stroke="{GRID_COLOR}"/>')
+        parts.append(f'<text x="{left - 8}" y="{position + TICK_SIZE / 3:.1f}" font-size="{TICK_SIZE}" '
+                     f'text-anchor="end">{escape(text)}</text>')
+    parts.append(f'<text x="{width / 2}" y="{TITLE_SIZE + 16}" font-size="{TITLE_SIZE}" '
+                 f'text-anchor="middle">{escape(title)}</text>')
+    parts.append(f'<text x="{(left + right) / 2}" y="{height - 20}" font-size="{AXIS_TITLE_SIZE}" '
+                 f'text-anchor="middle">Number of Reviews</text>')
+    middle = (top + bottom) / 2
+    parts.append(f'<text x="22" y="{middle}" font-size="{AXIS_TITLE_SIZE}" text-anchor="middle" '
+                 f'transform="rotate(-90 22 {middle})">Rating</text>')
+    for point in layout['points']:
+        parts.append(f'<circle cx="{point["x"]:.1f}" cy="{point["y"]:.1f}" r="{MARKER_RADIUS}" fill="{MARKER_COLOR}"/>')
+        for text, baseline in label_lines(point):
+            parts.append(f'<text x="{point["x"]:.1f}" y="{baseline:.1f}" font-size="{LABEL_SIZE}" '
+                         f'text-anchor="middle">{escape(text)}</text>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def render_scatter(places, title, width=WIDTH, height=HEIGHT):
+    # The same chart as scatter_svg, drawn with Pillow; raises OSError when no
+    # font is available
+    from PIL import Image, ImageDraw
+
+    from .posters import load_font
+
+    layout = scatter_layout(places, title, width, height)
+    left, top, right, bottom = layout['plot']
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    tick_font = load_font(400, TICK_SIZE)
+    axis_font = load_font(400, AXIS_TITLE_SIZE)
+    label_font = load_font(400, LABEL_SIZE)
+
+    draw.rectangle((left, top, right, bottom), fill=PLOT_COLOR)
+    for position, text in layout['x_ticks']:
+        draw.line((position, top, position, bottom), fill=GRID_COLOR)
+        draw.text((position, bottom + TICK_SIZE + 6), text, font=tick_font, fill=TEXT_COLOR, anchor='ms')
+    for position, text in layout['y_ticks']:
+        draw.line((left, position, right, position), fill=GRID_COLOR)
+        draw.text((left - 8, position + TICK_SIZE / 3), text, font=tick_font, fill=TEXT_COLOR, anchor='rs')
+    draw.text((width / 2, TITLE_SIZE + 16), title, font=load_font(400, TITLE_SIZE), fill=TEXT_COLOR, anchor='ms')
+    draw.text(((left + right) / 2, height - 20), "Number of Reviews", font=axis_font, fill=TEXT_COLOR, anchor='ms')
+
+    # Pillow has no rotated text: draw the y axis title flat and turn it
+    size = (bottom - top, AXIS_TITLE_SIZE * 2)
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).text((size[0] / 2, AXIS_TITLE_SIZE * 1.5), "Rating", font=axis_font, fill=255, anchor='ms')
+    mask = mask.rotate(90, expand=True)
+    image.paste(Image.new('RGB', mask.size, TEXT_COLOR), (round(22 - AXIS_TITLE_SIZE * 1.5), top), mask)
+
+    for point in layout['points']:
+        x, y = point['x'], point['y']
+        draw.ellipse((x - MARKER_RADIUS, y - MARKER_RADIUS, x + MARKER_RADIUS, y + MARKER_RADIUS), fill=MARKER_COLOR)
+        for text, baseline in label_lines(point):
+            draw.text((x, baseline), text, font=label_font, fill=TEXT_COLOR, anchor='ms')
+    return image
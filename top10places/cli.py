@@ -0,0 +1,140 @@
+import argparse
+import os
+import sys
+
+from .encoding import PRESETS
+from .pages import ASPECTS
+from .ranking import STRATEGIES
+
+# Headless entry point, for workers and cron jobs. ``pip install .`` also
+# installs it as the ``top10places`` command (see pyproject.toml).
+#
+#     python -m top10places generate paste.txt --area Bandung --place-type Cafe
+#     pbpaste | python -m top10places generate - --area Bandung --place-type Cafe -o cafe.zip
+#     python -m top10places generate scroll1.txt scroll2.txt --area Bandung --place-type Cafe
+#     python -m top10places generate new.txt --index bandung.json --area Bandung --place-type Cafe
+#     python -m top10places batch manifest.json --output out/
+#     INSTAGRAM_PASSWORD=... python -m top10places generate paste.txt --area Bandung --place-type Cafe --instagram me
+
+
+def generate(args):
+    from .tracing import configure_logging, trace
+
+    # TOP10PLACES_TRACE_LOG=- prints the stage timings as a JSON line
+    configure_logging()
+    with trace("generate", area=args.area, place_type=args.place_type, top_n=args.top_n):
+        return _generate(args)
+
+
+def _generate(args):
+    from .archive import write_zip, zip_entries, zip_file_name
+    from .encoding import summary
+    from .index import PlaceIndex
+    from .parsing import parse_text
+    from .render import create_carousel_images
+    from .tracing import span
+
+    texts = []
+    for paste in args.paste:
+        if paste == "-":
+            texts.append(sys.stdin.read())
+        else:
+            with open(paste, encoding="utf-8") as f:
+                texts.append(f.read())
+    with span("parse", bytes=sum(len(text) for text in texts)) as stage:
+        if len(texts) == 1 and not args.index:
+            places = parse_text(texts[0])
+        else:
+            # Overlapping pastes (and an earlier --index) are merged without duplicates
+            places = PlaceIndex.load(args.index) if args.index else PlaceIndex()
+            for paste, text in zip(args.paste, texts):
+                stats = places.ingest(text)
+                print(f"{paste}: {stats['parsed']} places, {stats['added']} new, {stats['updated']} updated",
+                      file=sys.stderr)
+            if args.index:
+                places.save(args.index)
+        stage['count'] = len(places)
+    if not places:
+        print("No valid data found. Please check your input.", file=sys.stderr)
+        return 1
+
+    area, place_type, top_n = args.area, args.place_type, args.top_n
+    images = create_carousel_images(
+        place_type, area, top_n, places, args.strategy, args.preset, args.theme, args.aspect, args.split,
+        args.chart,
+    )
+    entries = zip_entries(images, top_n, args.chart)
+
+    output = args.output or zip_file_name(top_n, place_type, area)
+    if output == "-":
+        write_zip(sys.stdout.buffer, entries)
+    else:
+        with open(output, "wb") as f:
+            write_zip(f, entries)
+        print(f"{len(places)} places -> {output}", file=sys.stderr)
+    for line in summary(entries):
+        print(f"  {line}", file=sys.stderr)
+
+    if args.instagram:
+        from .instagram import get_client
+
+        client = get_client(args.instagram, os.environ.get("INSTAGRAM_PASSWORD"))
+        result = client.upload_carousel(images, caption=f"Top {top_n} {place_type} in {area}")
+        print(f"Uploaded to Instagram as {result['code']}", file=sys.stderr)
+        for metric in result['metrics']:
+            print(f"  {metric['step']}: {metric['ms']:.0f} ms, {metric['attempts']} attempt(s)", file=sys.stderr)
+    return 0
+
+
+def batch(args):
+    from .batch import load_manifest, run_batch
+
+    return 1 if run_batch(load_manifest(args.manifest), args.output, args.concurrency, args.preset, args.theme,
+                          args.aspect, args.split, args.chart) else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="top10places", description="Generate Top N places carousels.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("generate", help="render one carousel ZIP from a pasted Maps list")
+    command.add_argument("paste", nargs="+",
+                         help="file(s) with the pasted Google Maps text, or - for stdin; overlaps are merged")
+    command.add_argument("--index", metavar="PATH",
+                         help="JSON place index to merge the pastes into and save (created if missing)")
+    command.add_argument("--area", required=True, help="area name for the titles, e.g. Bandung")
+    command.add_argument("--place-type", required=True, help="type of place for the titles, e.g. Cafe")
+    command.add_argument("--top-n", type=int, default=10, help="number of places to rank (default 10)")
+    command.add_argument("--strategy", choices=list(STRATEGIES), default="reviews", help="ranking strategy")
+    command.add_argument("--preset", choices=list(PRESETS), default="png", help="image format preset (default png)")
+    command.add_argument("--theme", default="classic", help="template theme (see top10places/themes)")
+    command.add_argument("--aspect", choices=list(ASPECTS), default="3:4", help="frame shape (default 3:4)")
+    command.add_argument("--split", action="store_true", help="spread a long list over several frames")
+    command.add_argument("--chart", action="store_true", help="add a reviews vs rating chart frame")
+    command.add_argument("-o", "--output", help="ZIP path, or - for stdout (default: derived from the titles)")
+    command.add_argument("--instagram", metavar="USERNAME",
+                         help="also post the carousel to this account (password from INSTAGRAM_PASSWORD "
+                              "unless a session is saved)")
+    command.set_defaults(handler=generate)
+
+    command = commands.add_parser("batch", help="render one carousel ZIP per manifest entry")
+    command.add_argument("manifest", help="JSON or CSV manifest of area, place_type, top_n, paste")
+    command.add_argument("-o", "--output", default="output", help="directory for the ZIP files")
+    command.add_argument("-c", "--concurrency", type=int, default=None,
+                         help="jobs rendered at once (default: renderer page limit)")
+    command.add_argument("--preset", choices=list(PRESETS), default="png", help="image format preset (default png)")
+    command.add_argument("--theme", default="classic", help="template theme (see top10places/themes)")
+    command.add_argument("--aspect", choices=list(ASPECTS), default="3:4", help="frame shape (default 3:4)")
+    command.add_argument("--split", action="store_true", help="spread a long list over several frames")
+    command.add_argument("--chart", action="store_true", help="add a reviews vs rating chart frame")
+    command.set_defaults(handler=batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except Exception as e:
+        print(f"top10places: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,123 @@
+import io
+import time
+
+from . import tracing
+from .artifacts import ImageArtifact
+
+# Output encoding for carousel frames.
+#
+# Frames are rasterised as lossless PNG. A preset picks the format the
+# artifacts are delivered in; Chromium frames use Playwright's own JPEG
+# screenshot encoder when the preset allows it, everything else is encoded
+# once with Pillow. Every encoded artifact records what the encode cost and
+# saved in ``artifact.stats``:
+#
+#     {'preset', 'format', 'source_bytes', 'bytes', 'saved_bytes', 'encode_ms', 'native'}
+#
+# source_bytes is None when Chromium encoded the frame directly, since no
+# PNG was ever produced to compare against.
+
+
+class Preset:
+    def __init__(self, name, label, format=None, native=False, **options):
+        self.name = name
+        self.label = label
+        # None keeps the PNG exactly as captured
+        self.format = format
+        # Let Chromium encode the screenshot itself (JPEG only)
+        self.native = native
+        self.options = options
+
+    def screenshot_options(self):
+        # Extra page.screenshot() arguments for frames captured by Chromium
+        if self.native and self.format == 'jpeg':
+            return {'type': 'jpeg', 'quality': self.options.get('quality', 80)}
+        return {}
+
+    def save(self, image, buffer):
+        options = self.options
+        if self.format == 'jpeg':
+            image.convert('RGB').save(buffer, format='JPEG', quality=options.get('quality', 80),
+                                      subsampling=options.get('subsampling', -1),
+                                      progressive=options.get('progressive', False), optimize=options.get('optimize', False))
+        elif self.format == 'webp':
+            image.save(buffer, format='WEBP', quality=options.get('quality', 80), method=options.get('method', 4))
+        else:
+            # Screenshots are flat UI colours, so a palette rarely shows
+            if options.get('colors'):
+                from PIL import Image
+
+                image = image.convert('RGB').quantize(options['colors'], method=Image.Quantize.FASTOCTREE)
+            image.save(buffer, format='PNG', optimize=options.get('optimize', False))
+
+
+PRESETS = {preset.name: preset for preset in (
+    Preset('png', "Lossless PNG (as captured)"),
+    Preset('optimized', "Optimised PNG (256 colours)", 'png', colors=256, optimize=True),
+    Preset('fast', "Fast (JPEG 80)", 'jpeg', native=True, quality=80),
+    Preset('small', "Smallest (WebP 75)", 'webp', quality=75, method=6),
+    # Instagram re-encodes uploads itself; full chroma keeps small text crisp
+    Preset('instagram', "Instagram (JPEG 92)", 'jpeg', quality=92, subsampling=0, progressive=True, optimize=True),
+)}
+
+
+def get_preset(preset='png'):
+    if isinstance(preset, Preset):
+        return preset
+    return PRESETS[preset]
+
+
+def _stats(preset, artifact, source_bytes, elapsed, native=False):
+    artifact.stats = {
+        'preset': preset.name,
+        'format': artifact.format,
+        'source_bytes': source_bytes,
+        'bytes': len(artifact.data),
+        'saved_bytes': source_bytes - len(artifact.data) if source_bytes is not None else None,
+        'encode_ms': elapsed * 1000,
+        'native': native,
+    }
+    return artifact
+
+
+def encode_image(image, preset='png'):
+    # Encode a PIL image (a native poster) straight into the preset's format
+    preset = get_preset(preset)
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    with tracing.span("encode", count=1, preset=preset.name) as stage:
+        preset.save(image, buffer)
+        stage['bytes'] = buffer.tell()
+    artifact = ImageArtifact(buffer.getvalue(), preset.format or 'png', image)
+    return _stats(preset, artifact, None, time.perf_counter() - start)
+
+
+def encode(artifact, preset='png', native=False):
+    # Re-encode a captured artifact; ``native`` marks one Chromium already
+    # delivered in the preset's format
+    preset = get_preset(preset)
+    if native or preset.format is None:
+        return _stats(preset, artifact, None if native else len(artifact.data), 0, native)
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    with tracing.span("encode", count=1, preset=preset.name) as stage:
+        preset.save(artifact.image, buffer)
+        stage['bytes'] = buffer.tell()
+    encoded = ImageArtifact(buffer.getvalue(), preset.format)
+    return _stats(preset, encoded, len(artifact.data), time.perf_counter() - start)
+
+
+def summary(artifacts):
+    # One line per artifact, for the CLI and the UI
+    lines = []
+    for name, artifact in artifacts:
+        stats = artifact.stats or {}
+        line = f"{name}: {stats.get('bytes', len(artifact.data)) / 1024:.1f} KB {artifact.format}"
+        if stats.get('saved_bytes') and stats['source_bytes']:
+            line += f", {-stats['saved_bytes'] / stats['source_bytes']:+.0%} vs PNG ({stats['saved_bytes'] / 1024:.1f} KB saved)"
+        elif stats.get('native'):
+            line += ", encoded by Chromium"
+        if stats.get('encode_ms'):
+            line += f", {stats['encode_ms']:.1f} ms"
+        lines.append(line)
+    return lines
@@ -0,0 +1,182 @@
+import heapq
+import json
+import os
+import sys
+import unicodedata
+
+from .parsing import iter_records
+from .places import Places, _rating
+from .ranking import get_strategy
+
+# Deduplicating place index for pastes that arrive in several chunks.
+#
+# Maps results are often pasted a scroll at a time, and consecutive scrolls
+# overlap. A PlaceIndex is a Places container that also keeps a hash index
+# from each place's normalised (name, address) to its row, so ingesting a
+# paste only parses that paste: new places are appended, known ones take the
+# latest rating and review count (last write wins), identical repeats change
+# nothing. Rankings are kept per (top_n, strategy) and updated from the rows
+# a paste changed, so merging a chunk costs time in proportion to the chunk;
+# a full re-rank only happens when a place in the current top N loses
+# reviews or rating.
+#
+#     index = PlaceIndex()
+#     index.ingest(first_scroll)
+#     index.ingest(second_scroll)   # {'parsed': 40, 'added': 22, 'updated': 3, 'unchanged': 15}
+#     rank(index, 10)               # same result as ranking the merged places from scratch
+#
+# An index can be kept in st.session_state for a session, or saved to and
+# loaded from a JSON file. Its revision goes up whenever a paste changes it
+# (or it is cleared), so it can stand in for the contents in cache keys.
+
+
+def normalize(text):
+    # Case, Unicode form and spacing differ between pastes of the same place
+    return " ".join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+class _Ranking:
+    # The current top N of one strategy, as row -> (key, -row). Ties resolve
+    # to the earlier row, as heapq.nlargest does.
+
+    def __init__(self, index, top_n, strategy):
+        self.index = index
+        self.top_n = top_n
+        self.strategy = strategy
+        self.members = {}
+        self.stale = True
+        self.result = None
+
+    def key(self, row):
+        place = {'rating': _rating(self.index.ratings[row]), 'reviews': self.index.reviews[row]}
+        if not self.strategy.accept(place):
+            return None
+        return self.strategy.select_key(place), -row
+
+    def update(self, rows):
+        members = self.members
+        for row in rows:
+            if self.stale:
+                return
+            key = self.key(row)
+            if row in members:
+                if key is None or key < members[row]:
+                    # A leader got worse; a place outside the top may now beat it
+                    self.stale = True
+                else:
+                    members[row] = key
+            elif key is not None:
+                if len(members) < self.top_n:
+                    members[row] = key
+                else:
+                    weakest = min(members, key=members.__getitem__)
+                    if key > members[weakest]:
+                        del members[weakest]
+                        members[row] = key
+        self.result = None
+
+    def rebuild(self):
+        select_key, _ = self.strategy.column_keys(self.index)
+        rows = range(len(self.index))
+        if self.strategy.min_reviews:
+            reviews, min_reviews = self.index.reviews, self.strategy.min_reviews
+            rows = [row for row in rows if reviews[row] >= min_reviews]
+        self.members = {row: self.key(row) for row in heapq.nlargest(self.top_n, rows, key=select_key)}
+        self.stale = False
+        self.result = None
+
+    def get(self):
+        if self.stale:
+            self.rebuild()
+        if self.result is None:
+            # Order the members exactly as ranking._rank_columns would
+            _, order_key = self.strategy.column_keys(self.index)
+            top = sorted(self.members, key=self.members.__getitem__, reverse=True)
+            top.sort(key=order_key, reverse=True)
+            top_places = self.index.take(top)
+            self.result = {
+                'places': top_places,
+                'most_reviews': top_places.max('reviews') if top else 0,
+                'highest_rating': top_places.max('rating') if top else 0,
+            }
+        return self.result
+
+
+class PlaceIndex(Places):
+    __slots__ = ('keys', 'rankings', 'revision')
+
+    def __init__(self):
+        super().__init__()
+        self.keys = {}
+        self.rankings = {}
+        self.revision = 0
+
+    @staticmethod
+    def key(name, address):
+        return normalize(name), normalize(address)
+
+    def upsert(self, name, rating, reviews, address):
+        # Add or update one place; returns its row and 'added', 'updated' or
+        # 'unchanged'
+        key = self.key(name, address)
+        row = self.keys.get(key)
+        if row is None:
+            row = self.keys[key] = len(self)
+            self.append(name, rating, reviews, address)
+            return row, 'added'
+        before = self[row]
+        self.ratings[row] = rating
+        self.reviews[row] = reviews
+        # The latest paste also decides how the name and address are spelled
+        self.names[row] = sys.intern(name)
+        self.addresses[row] = sys.intern(address)
+        return row, 'unchanged' if self[row] == before else 'updated'
+
+    def ingest(self, text):
+        # Parse one paste (a string, file or iterable of lines) and merge it
+        stats = {'parsed': 0, 'added': 0, 'updated': 0, 'unchanged': 0}
+        changed = []
+        for name, rating, reviews, address in iter_records(text):
+            row, outcome = self.upsert(name, rating, reviews, address)
+            stats['parsed'] += 1
+            stats[outcome] += 1
+            if outcome != 'unchanged':
+                changed.append(row)
+        if changed:
+            self.revision += 1
+            for ranking in self.rankings.values():
+                ranking.update(changed)
+        return stats
+
+    def ranking(self, top_n, strategy='reviews', **options):
+        # rank() for this index, kept up to date as pastes are ingested
+        strategy = get_strategy(strategy, **options)
+        cache_key = (top_n, strategy.name, tuple(sorted(vars(strategy).items())))
+        ranking = self.rankings.get(cache_key)
+        if ranking is None:
+            ranking = self.rankings[cache_key] = _Ranking(self, top_n, strategy)
+        return ranking.get()
+
+    def clear(self):
+        revision = self.revision
+        self.__init__()
+        self.revision = revision + 1
+
+    def save(self, path):
+        # Written whole and then moved into place, so a crash never leaves half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for place in json.load(f):
+                    index.upsert(place['name'], place['rating'], place['reviews'], place['address'])
+        return index
+
+    def __repr__(self):
+        return f"<PlaceIndex: {len(self)} places>"
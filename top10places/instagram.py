@@ -0,0 +1,446 @@
+import concurrent.futures
+import hashlib
+import hmac
+import http.server
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from .artifacts import as_artifact
+
+# Instagram carousel uploads straight from the in-memory artifacts.
+#
+# A Client talks to Instagram's mobile API with one requests.Session per
+# account. The session (cookies and device ids) is saved after login and
+# reloaded by later processes, and get_client() keeps logged-in clients for
+# the life of the process, so repeated uploads do not log in again. Photos of
+# a carousel upload concurrently and are then published as one album post.
+# Requests that hit a rate limit (429, "please wait") or a server error are
+# retried with exponential backoff and jitter, honouring Retry-After.
+#
+# A saved session is only reused with the password that created it (or with
+# no password at all, for a trusted CLI): the file keeps a salted hash of
+# that password, so a different password has to log in successfully first.
+#
+# Every step is timed; upload_carousel() returns the media plus the metrics
+# of that call (pass ``metrics=[]`` to keep them when the upload fails):
+#
+#     [{'step': 'login', 'ms': 412.0, 'attempts': 1, 'status': 200}, ...]
+#
+# MockInstagram serves the same endpoints locally, so the whole pipeline can
+# be exercised without an account (tests/test_instagram.py).
+
+API_URL = "https://i.instagram.com"
+USER_AGENT = ("Instagram 269.0.0.18.75 Android (26/8.0.0; 480dpi; 1080x1920; "
+              "OnePlus; 6T Dev; devitron; qcom; en_US; 314665256)")
+APP_ID = "567067343352427"
+DEFAULT_SESSION_DIR = os.path.join(os.path.expanduser("~"), ".cache", "top10places", "instagram")
+
+# Instagram usernames; this also keeps them safe to use as file names
+USERNAME = re.compile(r'[A-Za-z0-9._]{1,30}')
+VERIFIER_ITERATIONS = 100_000
+
+# Instagram only accepts feed photos between 4:5 portrait and 1.91:1 landscape
+MIN_ASPECT = 4 / 5
+MAX_ASPECT = 1.91
+
+logger = logging.getLogger(__name__)
+
+
+class InstagramError(RuntimeError):
+    pass
+
+
+class LoginRequired(InstagramError):
+    pass
+
+
+class RateLimited(InstagramError):
+    pass
+
+
+def password_verifier(password, salt=None):
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, VERIFIER_ITERATIONS)
+    return {'salt': salt.hex(), 'hash': digest.hex()}
+
+
+def check_password(password, verifier):
+    if not verifier or 'salt' not in verifier:
+        return False
+    expected = password_verifier(password, bytes.fromhex(verifier['salt']))['hash']
+    return hmac.compare_digest(expected, verifier.get('hash', ''))
+
+
+def prepare_photo(artifact):
+    # JPEG bytes inside Instagram's aspect range; frames that already qualify
+    # are sent as they are, others are padded with white and encoded once
+    from .encoding import encode_image
+
+    width, height = artifact.size
+    aspect = width / height
+    if artifact.format == 'jpeg' and MIN_ASPECT <= aspect <= MAX_ASPECT:
+        return artifact
+    image = artifact.image
+    if aspect < MIN_ASPECT or aspect > MAX_ASPECT:
+        from PIL import Image
+
+        if aspect < MIN_ASPECT:
+            size = (math.ceil(height * MIN_ASPECT), height)
+        else:
+            size = (width, math.ceil(width / MAX_ASPECT))
+        canvas = Image.new('RGB', size, 'white')
+        canvas.paste(image.convert('RGB'), ((size[0] - width) // 2, (size[1] - height) // 2))
+        image = canvas
+    return encode_image(image, 'instagram')
+
+
+class Client:
+    def __init__(self, username, password=None, base_url=API_URL, session_dir=DEFAULT_SESSION_DIR,
+                 max_retries=4, backoff=1.0, max_backoff=60, timeout=30, upload_workers=3):
+        import requests
+
+        if not USERNAME.fullmatch(username or ''):
+            raise InstagramError(f"{username!r} is not a valid Instagram username.")
+        self.username = username
+        self.password = password
+        self.base_url = base_url.rstrip('/')
+        self.session_dir = session_dir
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.upload_workers = upload_workers
+        self.user_id = None
+        # Salted hash of the password the saved session was logged in with
+        self.verifier = None
+        # Bumped on every login, so concurrent requests that all find the
+        # session expired log in only once
+        self.generation = 0
+        self.device_id = f"android-{uuid.uuid4().hex[:16]}"
+        self.uuid = str(uuid.uuid4())
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'X-IG-App-ID': APP_ID,
+            'Accept-Language': 'en-US',
+        })
+        self._login_lock = threading.Lock()
+        self.load_session()
+
+    # -- session -----------------------------------------------------------
+
+    @property
+    def session_path(self):
+        if not self.session_dir:
+            return None
+        return os.path.join(self.session_dir, f"{self.username.lower()}.json")
+
+    @property
+    def logged_in(self):
+        return self.user_id is not None
+
+    def load_session(self):
+        path = self.session_path
+        if path is None or not os.path.exists(path):
+            return False
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if self.password is not None and not check_password(self.password, state.get('verifier')):
+            # Someone else's session, or an old password: log in before using it
+            return False
+        self.verifier = state.get('verifier')
+        self.user_id = state.get('user_id')
+        self.device_id = state.get('device_id', self.device_id)
+        self.uuid = state.get('uuid', self.uuid)
+        self.session.cookies.update(state.get('cookies', {}))
+        return True
+
+    def save_session(self):
+        path = self.session_path
+        if path is None:
+            return
+        os.makedirs(self.session_dir, exist_ok=True)
+        state = {
+            'user_id': self.user_id,
+            'device_id': self.device_id,
+            'uuid': self.uuid,
+            'cookies': self.session.cookies.get_dict(),
+            'verifier': self.verifier,
+        }
+        # The cookies are as good as the password; keep them private, and
+        # replace the file whole so a concurrent reader never sees half of it
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def login(self, generation=None, metrics=None):
+        if self.password is None:
+            raise LoginRequired(f"No saved session for {self.username}; a password is needed.")
+        with self._login_lock:
+            if generation is not None and generation != self.generation:
+                return
+            response = self._request('login', 'POST', '/api/v1/accounts/login/', data=self._signed({
+                'username': self.username,
+                'enc_password': f"#PWD_INSTAGRAM:0:{int(time.time())}:{self.password}",
+                'device_id': self.device_id,
+                'guid': self.uuid,
+                'login_attempt_count': 0,
+            }), authenticated=False, metrics=metrics)
+            self.user_id = response['logged_in_user']['pk']
+            self.verifier = password_verifier(self.password)
+            self.generation += 1
+            self.save_session()
+
+    def logout(self):
+        # Forget the saved session; the next upload logs in again
+        self.user_id = None
+        self.verifier = None
+        self.session.cookies.clear()
+        if self.session_path and os.path.exists(self.session_path):
+            os.remove(self.session_path)
+
+    # -- requests ----------------------------------------------------------
+
+    def _signed(self, payload):
+        return {'signed_body': f"SIGNATURE.{json.dumps(payload, separators=(',', ':'))}"}
+
+    def _record(self, metrics, step, start, attempts, status):
+        # Metrics go to the list of the call that made the request, never to
+        # the client, which is shared by every upload to the account
+        metric = {'step': step, 'ms': (time.perf_counter() - start) * 1000, 'attempts': attempts, 'status': status}
+        if metrics is not None:
+            metrics.append(metric)
+        logger.info("instagram %s: %d in %.0f ms (%d attempts)", step, status or 0, metric['ms'], attempts)
+
+    def _delay(self, attempt, response):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, int(retry_after))
+        # Full jitter keeps several workers from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _request(self, step, method, path, authenticated=True, metrics=None, **kwargs):
+        import requests
+
+        start = time.perf_counter()
+        relogged = False
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            generation = self.generation
+            try:
+                response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            except requests.ConnectionError as e:
+                error = InstagramError(f"{step}: {e}")
+            else:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                message = str(body.get('message', ''))
+                if response.ok and body.get('status', 'ok') == 'ok':
+                    self._record(metrics, step, start, attempt, response.status_code)
+                    return body
+                if response.status_code in (401, 403) or message == 'login_required':
+                    if not authenticated or relogged:
+                        self._record(metrics, step, start, attempt, response.status_code)
+                        raise LoginRequired(f"{step}: {message or response.status_code}")
+                    # The saved session expired: log in once more and retry
+                    self.login(generation, metrics)
+                    relogged = True
+                    continue
+                if response.status_code == 429 or 'wait a few minutes' in message:
+                    error = RateLimited(f"{step}: rate limited ({message or 429})")
+                elif response.status_code >= 500:
+                    error = InstagramError(f"{step}: server error {response.status_code}")
+                else:
+                    self._record(metrics, step, start, attempt, response.status_code)
+                    raise InstagramError(f"{step}: {message or response.status_code}")
+            if attempt > self.max_retries:
+                self._record(metrics, step, start, attempt, response.status_code if response is not None else None)
+                raise error
+            time.sleep(self._delay(attempt - 1, response))
+
+    # -- uploads -----------------------------------------------------------
+
+    def upload_photo(self, artifact, step='upload', metrics=None):
+        # Send one JPEG and return its upload id
+        upload_id = str(int(time.time() * 1000)) + str(random.randint(100, 999))
+        name = f"{upload_id}_0_{random.randint(1000000000, 9999999999)}"
+        params = {
+            'upload_id': upload_id,
+            'media_type': '1',
+            'retry_context': json.dumps({'num_step_auto_retry': 0, 'num_reupload': 0, 'num_step_manual_retry': 0}),
+            'image_compression': json.dumps({'lib_name': 'moz', 'lib_version': '3.1.m', 'quality': '92'}),
+            'is_sidecar': '1',
+        }
+        self._request(step, 'POST', f'/rupload_igphoto/{name}', data=artifact.data, metrics=metrics, headers={
+            'X-Instagram-Rupload-Params': json.dumps(params),
+            'X-Entity-Name': name,
+            'X-Entity-Length': str(len(artifact.data)),
+            'X-Entity-Type': 'image/jpeg',
+            'Offset': '0',
+            'Content-Type': 'application/octet-stream',
+        })
+        return upload_id
+
+    def upload_carousel(self, images, caption="", metrics=None):
+        # Publish 2-10 images as one album post; returns the media and the
+        # metrics of this call, appended to ``metrics`` when one is given
+        metrics = [] if metrics is None else metrics
+        if not 2 <= len(images) <= 10:
+            raise InstagramError(f"A carousel needs 2 to 10 images, got {len(images)}.")
+        start = time.perf_counter()
+        if not self.logged_in:
+            self.login(metrics=metrics)
+
+        prepare_start = time.perf_counter()
+        photos = [prepare_photo(as_artifact(image))
+                  for image in images]
+        self._record(metrics, 'prepare', prepare_start, 1, None)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            upload_ids = list(executor.map(
+                lambda item: self.upload_photo(item[1], f"upload {item[0]}", metrics), enumerate(photos, 1)
+            ))
+
+        response = self._request('configure', 'POST', '/api/v1/media/configure_sidecar/', data=self._signed({
+            'caption': caption,
+            'client_sidecar_id': str(int(time.time() * 1000)),
+            'source_type': '4',
+            'device_id': self.device_id,
+            '_uuid': self.uuid,
+            'children_metadata': [
+                {'upload_id': upload_id, 'source_type': '4', 'caption': ''} for upload_id in upload_ids
+            ],
+        }), metrics=metrics)
+        self._record(metrics, 'total', start, 1, None)
+        self.save_session()
+        media = response.get('media', {})
+        return {'media_id': media.get('pk'), 'code': media.get('code'), 'metrics': metrics}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Keys the client cache without keeping passwords around in plain text
+_clients_secret = os.urandom(16)
+
+
+def get_client(username, password=None, **options):
+    # One client per account and password, so Streamlit reruns and later
+    # uploads reuse the logged-in session, while a different password gets
+    # a client of its own that has to log in
+    key = (username, password and hmac.new(_clients_secret, password.encode('utf-8'), 'sha256').hexdigest())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or options:
+            client = Client(username, password, **options)
+            _clients[key] = client
+        return client
+
+
+# -- local mock ------------------------------------------------------------
+
+
+class MockInstagram:
+    # Minimal stand-in for the endpoints above. ``rate_limit`` answers that
+    # many requests per path with 429 first; ``latency`` delays every reply.
+
+    def __init__(self, username='demo', password='secret', rate_limit=0, latency=0.0):
+        self.username = username
+        self.password = password
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.requests = []
+        self.uploads = {}
+        self.posts = []
+        self.logins = 0
+        self._limited = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, payload, headers = mock.handle(self.path, self.headers, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, path, headers, body):
+        from urllib.parse import parse_qs
+
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests.append(path)
+            route = path.split('/rupload_igphoto/')[0] or '/rupload_igphoto/'
+            if self._limited.get(route, 0) < self.rate_limit:
+                self._limited[route] = self._limited.get(route, 0) + 1
+                return 429, {'message': 'Please wait a few minutes before you try again.', 'status': 'fail'}, \
+                    [('Retry-After', '0')]
+
+        if path == '/api/v1/accounts/login/':
+            form = json.loads(parse_qs(body.decode('utf-8'))['signed_body'][0].split('.', 1)[1])
+            if form['username'] != self.username or not form['enc_password'].endswith(f":{self.password}"):
+                return 400, {'message': 'The password you entered is incorrect.', 'status': 'fail'}, []
+            with self._lock:
+                self.logins += 1
+            return 200, {'logged_in_user': {'pk': 1, 'username': self.username}, 'status': 'ok'}, \
+                [('Set-Cookie', 'sessionid=mock-session; Path=/'), ('Set-Cookie', 'ds_user_id=1; Path=/')]
+
+        if 'sessionid=mock-session' not in (headers.get('Cookie') or ''):
+            return 403, {'message': 'login_required', 'status': 'fail'}, []
+
+        if path.startswith('/rupload_igphoto/'):
+            if int(headers['X-Entity-Length']) != len(body) or not body.startswith(b'\xff\xd8'):
+                return 400, {'message': 'Invalid JPEG upload', 'status': 'fail'}, []
+            upload_id = json.loads(headers['X-Instagram-Rupload-Params'])['upload_id']
+            with self._lock:
+                self.uploads[upload_id] = len(body)
+            return 200, {'upload_id': upload_id, 'status': 'ok'}, []
+
+        if path == '/api/v1/media/configure_sidecar/':
+            form = json.loads(parse_qs(body.decode('utf-8'))['signed_body'][0].split('.', 1)[1])
+            children = [child['upload_id'] for child in form['children_metadata']]
+            if any(upload_id not in self.uploads for upload_id in children):
+                return 400, {'message': 'Unknown upload id', 'status': 'fail'}, []
+            with self._lock:
+                self.posts.append({'caption': form['caption'], 'children': children})
+                pk = len(self.posts)
+            return 200, {'media': {'pk': pk, 'code': f"MOCK{pk}"}, 'status': 'ok'}, []
+
+        return 404, {'message': 'Not found', 'status': 'fail'}, []
+
@@ -0,0 +1,380 @@
+import atexit
+import collections
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import threading
+import time
+
+from . import tracing
+from .renderer import RendererError
+
+# Render-job queue backed by a pool of worker processes.
+#
+# Each worker process owns its own renderer and keeps its Chromium warm, so
+# renders from concurrent sessions run on separate cores instead of sharing
+# one browser in the Streamlit process. Callers submit a module-level
+# function and its arguments, get a job id back and poll for the result:
+#
+#     jobs = get_job_queue()
+#     job_id = jobs.submit(create_carousel_images, place_type, area, top_n, places)
+#     while jobs.status(job_id)['state'] in ('queued', 'running'):
+#         time.sleep(0.2)
+#     poster, *lists, final = jobs.result(job_id)   # ImageArtifacts
+#
+# submit() raises QueueFull once ``max_pending`` jobs are waiting or running.
+# The parent hands each job to an idle worker over that worker's own pipe
+# and remembers which worker holds it. A job running longer than
+# ``job_timeout`` seconds fails with JobTimeout and its worker is killed and
+# replaced. A worker that dies before starting its job hands the job back
+# to the front of the queue; one that dies while running it fails the job
+# with RendererError. A job no worker takes within ``queue_timeout`` seconds
+# fails with JobTimeout. Results nobody collects expire after
+# ``result_ttl`` seconds.
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(RendererError):
+    pass
+
+
+class JobTimeout(RendererError):
+    pass
+
+
+def _worker(index, tasks, results):
+    from .renderer import get_renderer
+
+    # Ctrl+C reaches the whole process group; let the parent shut workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    renderer = get_renderer()
+    try:
+        renderer.warm()
+    except Exception as e:
+        # Jobs will report the launch error; keep serving so they can
+        logger.warning("render worker %d could not launch Chromium: %s", index, e)
+    results.send(('ready', None, index))
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        job_id, fn, args = task
+        results.send(('started', job_id, index))
+        # Stage timings go back to the caller's trace with the result
+        with tracing.trace("render job", export=False) as job_trace:
+            try:
+                value = fn(*args)
+            except Exception as e:
+                kind, value = 'failed', f"{type(e).__name__}: {e}"
+            else:
+                kind = 'done'
+        results.send(('spans', job_id, job_trace.as_dict()['spans']))
+        try:
+            results.send((kind, job_id, value))
+        except Exception as e:
+            results.send(('failed', job_id, f"Could not return the result: {type(e).__name__}: {e}"))
+    renderer.shutdown()
+
+
+class JobQueue:
+    def __init__(self, workers=2, max_pending=None, job_timeout=120, result_ttl=300, poll_interval=0.2,
+                 restart_delay=1.0, queue_timeout=None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.job_timeout = job_timeout
+        # How long a job may wait for a worker before it fails
+        self.queue_timeout = queue_timeout or job_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        # Playwright runs threads of its own, which fork() would not copy
+        self._context = multiprocessing.get_context('spawn')
+        # One dict per worker slot: its process, the parent's ends of its task
+        # and result pipes, whether it is ready and the job it holds
+        self._workers = []
+        self._queued = collections.deque()
+        self._jobs = {}
+        self._order = collections.deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                raise RendererError("Job queue has been shut down.")
+            if self._thread is not None:
+                return
+            self._workers = [self._spawn(index) for index in range(self.workers)]
+            self._thread = threading.Thread(target=self._supervise, name="render-jobs", daemon=True)
+            self._thread.start()
+
+    def _spawn(self, index):
+        # Each worker gets pipes of its own: killing one (on a timeout) can
+        # only break its own pipes, never a queue the other workers share
+        task_reader, task_writer = self._context.Pipe(duplex=False)
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker, args=(index, task_reader, result_writer), name=f"render-worker-{index}", daemon=True
+        )
+        process.start()
+        task_reader.close()
+        result_writer.close()
+        return {'process': process, 'tasks': task_writer, 'results': result_reader, 'ready': False,
+                'closed': False, 'job': None, 'spawned': time.monotonic()}
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            thread, workers = self._thread, self._workers
+            self._thread = None
+            self._changed.notify_all()
+        if thread is None:
+            return
+        thread.join(timeout=5)
+        for worker in workers:
+            try:
+                worker['tasks'].send(None)
+            except OSError:
+                pass
+        deadline = time.monotonic() + 10
+        for worker in workers:
+            worker['process'].join(timeout=max(0, deadline - time.monotonic()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['tasks'].close()
+            worker['results'].close()
+
+    # -- supervisor --------------------------------------------------------
+
+    def _supervise(self):
+        # Only this thread closes and replaces worker pipes, so the wait below
+        # never sees a closed connection
+        while not self._closed:
+            with self._lock:
+                readers = {worker['results']: index for index, worker in enumerate(self._workers)
+                           if not worker['closed']}
+            for reader in multiprocessing.connection.wait(list(readers), timeout=self.poll_interval):
+                try:
+                    message = reader.recv()
+                except (EOFError, OSError):
+                    # The worker exited; _check_workers fails its job and replaces it
+                    with self._lock:
+                        self._workers[readers[reader]].update(closed=True, ready=False)
+                    continue
+                with self._lock:
+                    self._handle(readers[reader], *message)
+            with self._lock:
+                self._check_workers()
+                self._dispatch()
+                self._expire()
+
+    def _handle(self, index, kind, job_id, value):
+        worker = self._workers[index]
+        if kind == 'ready':
+            worker['ready'] = True
+            return
+        job = self._jobs.get(job_id)
+        if kind in ('done', 'failed') and worker['job'] == job_id:
+            worker['job'] = None
+        if job is None or job['state'] not in ('queued', 'running'):
+            # Late message from a job that already timed out
+            return
+        if kind == 'started':
+            # The worker has the job; from here on its death fails the job
+            job.update(accepted=True, fn=None, args=None)
+        elif kind == 'spans':
+            job['spans'] = value
+        elif kind == 'done':
+            self._finish(job, 'done', value=value)
+        else:
+            self._finish(job, 'failed', error=RendererError(value))
+
+    def _dispatch(self):
+        # Hand queued jobs to idle workers, remembering which worker took which
+        for index, worker in enumerate(self._workers):
+            if not self._queued:
+                return
+            if not worker['ready'] or worker['job'] is not None:
+                continue
+            job = self._jobs.get(self._queued[0])
+            if job is None or job['state'] != 'queued':
+                self._queued.popleft()
+                continue
+            try:
+                worker['tasks'].send((job['id'], job['fn'], job['args']))
+            except (OSError, ValueError):
+                # The worker is gone; the job stays first in line
+                worker['ready'] = False
+                continue
+            except Exception as e:
+                self._queued.popleft()
+                self._finish(job, 'failed', error=RendererError(f"Could not send the job: {type(e).__name__}: {e}"))
+                continue
+            self._queued.popleft()
+            worker['job'] = job['id']
+            job.update(state='running', worker=index, started=time.monotonic(), started_at=time.perf_counter())
+
+    def _finish(self, job, state, value=None, error=None):
+        job.update(state=state, value=value, error=error, finished=time.monotonic(), fn=None, args=None)
+        if state == 'done':
+            self.completed += 1
+        else:
+            self.failed += 1
+        self._changed.notify_all()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for job in self._jobs.values():
+            if job['state'] == 'queued' and now - job['submitted'] > self.queue_timeout:
+                self.timeouts += 1
+                self._finish(job, 'failed', error=JobTimeout(
+                    f"No render worker was free within {self.queue_timeout}s; try again shortly."))
+            if job['state'] != 'running':
+                continue
+            index = job['worker']
+            process = self._workers[index]['process']
+            if now - job['started'] > self.job_timeout:
+                self.timeouts += 1
+                logger.warning("render job %s timed out after %ss on worker %d", job['id'], self.job_timeout, index)
+                process.kill()
+                process.join()
+                self._finish(job, 'failed', error=JobTimeout(f"Render job timed out after {self.job_timeout}s."))
+            elif process.is_alive():
+                continue
+            elif not job['accepted']:
+                # Sent to a worker that died before taking it: back to the front of the line
+                job.update(state='queued', worker=None, started=None, started_at=None)
+                self._queued.appendleft(job['id'])
+            else:
+                self._finish(job, 'failed', error=RendererError("Render worker exited unexpectedly."))
+        for index, worker in enumerate(self._workers):
+            process = worker['process']
+            # Back off a little so a worker that dies on startup does not spin
+            if not process.is_alive() and not self._closed and now - worker['spawned'] > self.restart_delay:
+                self.restarts += 1
+                logger.warning("restarting render worker %d (exit code %s)", index, process.exitcode)
+                worker['tasks'].close()
+                worker['results'].close()
+                self._workers[index] = self._spawn(index)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._order:
+            job = self._jobs.get(self._order[0])
+            if job is not None:
+                if job['state'] in ('queued', 'running') or now - job['finished'] < self.result_ttl:
+                    break
+                del self._jobs[job['id']]
+            self._order.popleft()
+
+    # -- API ---------------------------------------------------------------
+
+    def pending(self):
+        return sum(1 for job in self._jobs.values() if job['state'] in ('queued', 'running'))
+
+    def submit(self, fn, *args):
+        self.start()
+        with self._lock:
+            if self.pending() >= self.max_pending:
+                raise QueueFull(f"All {self.workers} render workers are busy; try again shortly.")
+            job_id = f"{os.getpid()}-{next(self._ids)}"
+            self._jobs[job_id] = {'id': job_id, 'state': 'queued', 'worker': None, 'started': None,
+                                  'finished': None, 'value': None, 'error': None, 'submitted': time.monotonic(),
+                                  'submitted_at': time.perf_counter(), 'started_at': None, 'spans': (),
+                                  'fn': fn, 'args': args, 'accepted': False}
+            self._order.append(job_id)
+            self._queued.append(job_id)
+            self._dispatch()
+        return job_id
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {'state': 'unknown', 'position': None}
+            position = None
+            if job['state'] == 'queued':
+                position = sum(1 for other in self._order
+                               if other in self._jobs and self._jobs[other]['state'] == 'queued'
+                               and self._jobs[other]['submitted'] <= job['submitted'])
+            return {'state': job['state'], 'position': position}
+
+    def result(self, job_id, timeout=None):
+        # Block until the job finishes, then return its value or raise its error
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    raise KeyError(f"Unknown or expired render job {job_id}.")
+                if job['state'] not in ('queued', 'running'):
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Render job {job_id} is still {job['state']}.")
+                self._changed.wait(remaining)
+            del self._jobs[job_id]
+        current_trace = tracing.current()
+        if current_trace is not None and job['started_at'] is not None:
+            queue_wait = {'name': "queue wait", 'ms': (job['started_at'] - job['submitted_at']) * 1000,
+                          'start_ms': (job['submitted_at'] - current_trace.start) * 1000, 'worker': job['worker']}
+            current_trace.merge([queue_wait])
+            current_trace.merge(job['spans'], (job['started_at'] - current_trace.start) * 1000)
+        if job['error'] is not None:
+            raise job['error']
+        return job['value']
+
+    def health(self):
+        with self._lock:
+            states = collections.Counter(job['state'] for job in self._jobs.values())
+            return {
+                'workers': self.workers,
+                'alive': sum(1 for worker in self._workers if worker['process'].is_alive()),
+                'queued': states['queued'],
+                'running': states['running'],
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timeouts': self.timeouts,
+                'restarts': self.restarts,
+            }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    # RENDER_WORKERS=0 (the default) keeps rendering in-process; "auto" uses every core
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            workers = os.environ.get("RENDER_WORKERS", "0")
+            workers = os.cpu_count() or 1 if workers == "auto" else int(workers)
+            if workers <= 0:
+                return None
+            _job_queue = JobQueue(
+                workers=workers,
+                max_pending=int(os.environ.get("RENDER_QUEUE_MAX", "0")) or None,
+                job_timeout=float(os.environ.get("RENDER_JOB_TIMEOUT", "120")),
+                queue_timeout=float(os.environ.get("RENDER_QUEUE_TIMEOUT", "0")) or None,
+            )
+            atexit.register(_job_queue.shutdown)
+        return _job_queue
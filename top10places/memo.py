@@ -0,0 +1,100 @@
+import collections
+import io
+import threading
+
+from .artifacts import ImageArtifact
+from .places import Places
+
+# Bounded memo for one user's generation pipeline.
+#
+# Streamlit reruns the whole script on every widget change and every
+# download click. A Memo kept in st.session_state holds the outputs of the
+# pipeline stages (parsed places, list HTML, rendered images, the ZIP)
+# keyed by their inputs, so a rerun with the same inputs reuses them and
+# changing only top_n reuses the parse. Entries are weighed roughly by
+# size and evicted least recently used past max_bytes or max_entries.
+#
+#     memo = st.session_state.setdefault('memo', Memo())
+#     places = memo.get(('parse', digest(text)), lambda: parse_text(text))
+#
+# Values are computed outside the lock; two threads missing the same key
+# both compute it and the later one is kept.
+
+# Rough per-place weight of a Places container (four columns plus strings)
+PLACE_BYTES = 200
+
+
+def digest(text):
+    # Key for large inputs such as the paste, so the memo does not hold them twice.
+    # hashlib loads OpenSSL, so it is imported on first use rather than with the package
+    import hashlib
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sizeof(value):
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, io.BytesIO):
+        with value.getbuffer() as view:
+            return view.nbytes
+    if isinstance(value, ImageArtifact):
+        return len(value.data)
+    if isinstance(value, Places):
+        return len(value) * PLACE_BYTES
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(item) for item in value)
+    return 0
+
+
+class Memo:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = 0
+
+    def get(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = sizeof(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
@@ -0,0 +1,225 @@
+import math
+
+from .charts import scatter_svg
+from .places import Places
+from .ranking import rank
+from .templating import DEFAULT_THEME, markup, render
+
+# HTML for every carousel frame, rendered from the theme templates in
+# top10places/themes (see templating.py).
+
+# Every page includes READY_SCRIPT, which sets this attribute on <body>
+# once fonts, stylesheets, scripts and any ``window.renderReady`` promise
+# settle, so the renderer can capture as soon as the page is painted.
+READY_SELECTOR = 'body[data-rendered]'
+READY_SCRIPT = '''
+    <script>
+        window.addEventListener('load', function () {
+            Promise.all([document.fonts.ready, window.renderReady]).finally(function () {
+                requestAnimationFrame(function () {
+                    document.body.setAttribute('data-rendered', 'true');
+                });
+            });
+        });
+    </script>
+'''
+
+
+def create_scatter_plot_html(places, title, theme=DEFAULT_THEME):
+    if not places:
+        return "<p>No data available for scatter plot</p>"
+    # Drawn as inline SVG: nothing to download or run before capture
+    return render(
+        theme, 'scatter.html',
+        title=title,
+        svg=markup(scatter_svg(places, title)),
+        ready_script=markup(READY_SCRIPT),
+    )
+
+
+# Carousel frames. Each frame is a dict holding its rendered CSS, markup and
+# layout; page_html() lays one or more frames out in a single document. Frame
+# CSS is scoped to the frame's <section> (``scope`` in the .css templates), so
+# the title poster, the list and the closing poster can share one page and be
+# captured from a single load (see render.capture_frames_async).
+#
+#     width, height  size of the rendered frame in px (height None: content)
+#     aspect         (w, h) the frame is padded out to once laid out, or None
+#
+# Carousel list frames use the fixed layout: every box in list.css is sized
+# from LIST_LAYOUT, names and addresses stay on one line, so the frame's
+# canvas follows from the row count and the title's font metrics before the
+# page is loaded and Chromium lays it out exactly once. create_html() keeps
+# the flowing layout, for display.
+
+FRAME_WIDTH = 600
+FRAME_HEIGHT = 800
+FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css'
+
+# Canvas shapes offered for the carousel (Instagram allows 4:5 to 1.91:1;
+# 3:4 is the original poster size)
+ASPECTS = {'3:4': (3, 4), '4:5': (4, 5), '1:1': (1, 1)}
+
+CHART_TITLE = "Rating vs. number of reviews"
+
+LIST_LAYOUT = {
+    'padding': 20,
+    'content_width': 560,
+    'title_size': 24,
+    'title_line': 30,
+    'title_margin_top': 16,
+    'title_margin_bottom': 20,
+    'row_height': 92,
+    'row_gap': 15,
+    'footer_line': 14,
+    'footer_margin_top': 10,
+}
+
+
+def page_html(frames, title, sized=False, theme=None):
+    # With ``sized`` every frame gets its render size, as the compositor
+    # needs; otherwise frames fill the viewport like standalone pages
+    links = []
+    for frame in frames:
+        links.extend(link for link in frame['links'] if link not in links)
+    return render(
+        theme or frames[0]['theme'], 'page.html',
+        title=title,
+        links=links,
+        frames=frames,
+        sized=sized,
+        ready_script=markup(READY_SCRIPT)
+    )
+
+
+def fit_aspect(width, height, aspect):
+    # Smallest canvas of ``aspect`` that holds width x height, growing the
+    # short side only, as the old viewport resize did
+    ratio = aspect[1] / aspect[0]
+    if height / width > ratio:
+        return math.ceil(height / ratio), height
+    return width, math.ceil(width * ratio)
+
+
+def title_lines(title, layout=LIST_LAYOUT):
+    # Lines the list title wraps to. Measured with the poster fonts; DejaVu,
+    # the fallback, is wider than Inter, so it never under-counts
+    try:
+        from .posters import load_font, wrap_text
+
+        return len(wrap_text(title, load_font(700, layout['title_size']), layout['content_width']))
+    except (ImportError, OSError):
+        return math.ceil(len(title) * layout['title_size'] * 0.6 / layout['content_width'])
+
+
+def list_height(rows, lines=1, layout=LIST_LAYOUT):
+    # Content height of a fixed-layout list frame; its flex columns do not
+    # collapse margins, so this is a plain sum of the boxes in list.css
+    return (
+        2 * layout['padding']
+        + layout['title_margin_top'] + lines * layout['title_line'] + layout['title_margin_bottom']
+        + rows * (layout['row_height'] + layout['row_gap'])
+        + layout['footer_margin_top'] + layout['footer_line']
+    )
+
+
+def rows_per_frame(aspect, lines=1, layout=LIST_LAYOUT):
+    # Most rows a list frame holds without growing past the aspect's canvas
+    canvas = math.floor(FRAME_WIDTH * aspect[1] / aspect[0])
+    return max(1, (canvas - list_height(0, lines, layout)) // (layout['row_height'] + layout['row_gap']))
+
+
+def _frame(theme, key, template, links=(), height=FRAME_HEIGHT, width=FRAME_WIDTH, aspect=None, **context):
+    scope = f'#frame-{key}'
+    return {
+        'key': key,
+        'theme': theme,
+        # The template the frame was drawn from, e.g. to tell whether a theme
+        # changed it (the native posters only reproduce the classic design)
+        'template': template,
+        'links': list(links),
+        'style': markup(render(theme, f'{template.split("_")[-1]}.css', scope=scope, **context)),
+        'markup': markup(render(theme, f'{template}.html', key=key, **context)),
+        'width': width,
+        'height': height,
+        'aspect': aspect,
+    }
+
+
+def poster_frame(place_type, area, top_n, key='poster', theme=DEFAULT_THEME, aspect=None):
+    height = fit_aspect(FRAME_WIDTH, 0, ASPECTS[aspect])[1] if aspect else FRAME_HEIGHT
+    return _frame(theme, key, 'poster', height=height, place_type=place_type, area=area, top_n=top_n)
+
+
+def final_poster_frame(key='final', theme=DEFAULT_THEME, aspect=None):
+    height = fit_aspect(FRAME_WIDTH, 0, ASPECTS[aspect])[1] if aspect else FRAME_HEIGHT
+    return _frame(theme, key, 'final_poster', height=height)
+
+
+def chart_frame(places, title, key='chart', theme=DEFAULT_THEME, aspect=None):
+    # Reviews vs rating of the ranked places, as an SVG that needs no script
+    height = fit_aspect(FRAME_WIDTH, 0, ASPECTS[aspect])[1] if aspect else FRAME_HEIGHT
+    return _frame(theme, key, 'chart', height=height, title=title,
+                  svg=markup(scatter_svg(places, title, FRAME_WIDTH, height)))
+
+
+def _list_frame(theme, key, ranking, rows, title, area, place_type, start=0, aspect=None):
+    context = dict(
+        title=title,
+        area=area,
+        place_type=place_type,
+        places=rows,
+        start=start,
+        most_reviews=ranking['most_reviews'],
+        highest_rating=ranking['highest_rating'],
+    )
+    if aspect is None:
+        # The list grows with its content and is then padded out to 3:4
+        return _frame(theme, key, 'list', links=[FONT_AWESOME], height=None, aspect=(3, 4), **context)
+    lines = title_lines(title)
+    width, height = fit_aspect(FRAME_WIDTH, list_height(len(rows), lines), ASPECTS[aspect])
+    return _frame(theme, key, 'list', links=[FONT_AWESOME], width=width, height=height,
+                  fixed=True, layout=LIST_LAYOUT, title_lines=lines, **context)
+
+
+def list_frame(places, title, area, place_type, top_n, strategy='reviews', key='list', theme=DEFAULT_THEME,
+               aspect=None):
+    # Select the top places and find the most reviews and highest rating among them
+    ranking = rank(Places.from_places(places), top_n, strategy)
+    return _list_frame(theme, key, ranking, ranking['places'], title, area, place_type, aspect=aspect)
+
+
+def carousel_frames(places, area, place_type, top_n, strategy='reviews', theme=DEFAULT_THEME, aspect='3:4',
+                    split=False, chart=False):
+    # Title poster, list frame(s), optionally the reviews vs rating chart, and
+    # the closing poster. With ``split`` a list too long for one canvas
+    # continues over as many frames as it needs.
+    title = f"Top {top_n} {place_type} in {area}"
+    ranking = rank(Places.from_places(places), top_n, strategy)
+    top_places = ranking['places']
+    per_frame = rows_per_frame(ASPECTS[aspect], title_lines(title)) if split else len(top_places)
+    chunks = range(0, len(top_places), per_frame) if len(top_places) > per_frame else [0]
+    lists = [
+        _list_frame(theme, f'list-{i + 1}' if len(chunks) > 1 else 'list', ranking,
+                    top_places.take(range(start, min(start + per_frame, len(top_places)))),
+                    title, area, place_type, start, aspect)
+        for i, start in enumerate(chunks)
+    ]
+    return [
+        poster_frame(place_type, area, top_n, theme=theme, aspect=aspect),
+        *lists,
+        *([chart_frame(top_places, CHART_TITLE, theme=theme, aspect=aspect)] if chart else []),
+        final_poster_frame(theme=theme, aspect=aspect),
+    ]
+
+
+def create_html(places, title, area, place_type, top_n, strategy='reviews', theme=DEFAULT_THEME):
+    return page_html([list_frame(places, title, area, place_type, top_n, strategy, theme=theme)], title)
+
+
+def create_poster_html(place_type, area, top_n, theme=DEFAULT_THEME):
+    return page_html([poster_frame(place_type, area, top_n, theme=theme)], "Poster")
+
+
+def create_final_poster_html(theme=DEFAULT_THEME):
+    return page_html([final_poster_frame(theme=theme)], "Poster")
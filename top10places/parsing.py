@@ -0,0 +1,78 @@
+import io
+import re
+
+from .places import Places
+
+
+# A rating line starts with "4,7(1.234)" (or "4.7(1,234)" in English):
+# rating, then the review count. The count is either plain digits or
+# three-digit groups split by the locale's thousands separator, '.' or ','
+RATING_LINE = re.compile(r'(\d+[,\.]\d+)\((\d{1,3}(?:[,\.]\d{3})+|\d+)\)')
+PRICE_MARKERS = ('· $', '· $$', '· $$$')
+
+
+def extract_address(details):
+    # Improved address extraction logic
+    address = ""
+    if details.strip():
+        address_lines = details.strip().split('\n')
+        if address_lines:
+            first_line = address_lines[0]
+            if any(marker in first_line for marker in PRICE_MARKERS):
+                # Handle case with price indicators
+                if len(address_lines) > 1:
+                    second_line = address_lines[1]
+                    last_dot_index = second_line.rfind('· ')
+                    if last_dot_index != -1 and last_dot_index + 2 < len(second_line):
+                        address = second_line[last_dot_index + 2:].strip()
+                    else:
+                        address = second_line.strip()
+            else:
+                # Handle case without price indicators
+                last_dot_index = first_line.rfind('· ')
+                if last_dot_index != -1 and last_dot_index + 2 < len(first_line):
+                    address = first_line[last_dot_index + 2:].strip()
+                else:
+                    address = first_line.strip()
+    return address
+
+
+def iter_records(stream):
+    # Single pass over the lines of a paste (a string, file or any iterable of
+    # lines). A listing is the last non-blank line before a rating line, the
+    # rating line itself, and the detail lines up to the next empty line.
+    # Yields (name, rating, reviews, address) tuples.
+    if isinstance(stream, str):
+        stream = io.StringIO(stream)
+    name = ""
+    name_is_first = True
+    details = None
+    for index, line in enumerate(stream):
+        line = line.rstrip('\n')
+        if details is not None:
+            if line:
+                details.append(line)
+                continue
+            yield name, rating, reviews, extract_address('\n'.join(details))
+            name, name_is_first, details = "", True, None
+            continue
+        match = RATING_LINE.match(line) if index else None
+        if match:
+            rating = float(match.group(1).replace(',', '.'))
+            reviews = int(match.group(2).replace('.', '').replace(',', ''))
+            name = name if not name_is_first else name.strip()
+            details = [line[match.end():]]
+        elif line.strip():
+            name_is_first = not name and name_is_first
+            name = line.rstrip()
+    if details is not None:
+        yield name, rating, reviews, extract_address('\n'.join(details))
+
+
+def iter_places(stream):
+    for name, rating, reviews, address in iter_records(stream):
+        yield {'name': name, 'rating': rating, 'reviews': reviews, 'address': address}
+
+
+def parse_text(text):
+    return Places.from_records(iter_records(text))
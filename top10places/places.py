@@ -0,0 +1,110 @@
+import heapq
+import json
+import sys
+from array import array
+
+# Column-oriented storage for parsed places.
+#
+# Big pastes turn into tens of thousands of listings; one dict per place costs
+# a few hundred bytes and every consumer walks and copies those lists again.
+# Places keeps each field in its own column instead: float32 ratings, uint32
+# review counts and interned name/address strings. It still iterates and
+# indexes as the familiar {'name', 'rating', 'reviews', 'address'} dicts, so
+# existing code keeps working, while hot paths use the columns directly.
+
+FIELDS = ('name', 'rating', 'reviews', 'address')
+
+
+def _rating(value):
+    # float32 cannot hold 4.7 exactly; Maps ratings have at most a couple of
+    # decimals, so rounding restores the parsed value
+    return round(value, 3)
+
+
+class Places:
+    __slots__ = ('names', 'ratings', 'reviews', 'addresses')
+
+    def __init__(self):
+        self.names = []
+        self.ratings = array('f')
+        self.reviews = array('I')
+        self.addresses = []
+
+    @classmethod
+    def from_places(cls, places):
+        if isinstance(places, cls):
+            return places
+        result = cls()
+        for place in places:
+            result.append(place['name'], place['rating'], place['reviews'], place['address'])
+        return result
+
+    @classmethod
+    def from_records(cls, records):
+        # Build from (name, rating, reviews, address) tuples
+        result = cls()
+        intern = sys.intern
+        names, ratings, reviews, addresses = result.names, result.ratings, result.reviews, result.addresses
+        for name, rating, review_count, address in records:
+            names.append(intern(name))
+            ratings.append(rating)
+            reviews.append(review_count)
+            addresses.append(intern(address))
+        return result
+
+    def append(self, name, rating, reviews, address):
+        self.names.append(sys.intern(name))
+        self.ratings.append(rating)
+        self.reviews.append(reviews)
+        self.addresses.append(sys.intern(address))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return {
+            'name': self.names[index],
+            'rating': _rating(self.ratings[index]),
+            'reviews': self.reviews[index],
+            'address': self.addresses[index],
+        }
+
+    def __iter__(self):
+        for name, rating, reviews, address in zip(self.names, self.ratings, self.reviews, self.addresses):
+            yield {'name': name, 'rating': _rating(rating), 'reviews': reviews, 'address': address}
+
+    def __repr__(self):
+        return f"<Places: {len(self)} places>"
+
+    def column(self, field):
+        return {'name': self.names, 'rating': self.ratings, 'reviews': self.reviews, 'address': self.addresses}[field]
+
+    def min(self, field):
+        value = min(self.column(field))
+        return _rating(value) if field == 'rating' else value
+
+    def max(self, field):
+        value = max(self.column(field))
+        return _rating(value) if field == 'rating' else value
+
+    def top_k(self, k, field='reviews'):
+        # Indices of the k largest values, ties in input order like sorted()
+        return heapq.nlargest(k, range(len(self)), key=self.column(field).__getitem__)
+
+    def take(self, indices):
+        result = Places()
+        names, ratings, reviews, addresses = self.names, self.ratings, self.reviews, self.addresses
+        result.names = [names[i] for i in indices]
+        result.ratings = array('f', [ratings[i] for i in indices])
+        result.reviews = array('I', [reviews[i] for i in indices])
+        result.addresses = [addresses[i] for i in indices]
+        return result
+
+    def to_json(self):
+        # Serialise straight from the columns, without building per-place dicts
+        dumps = json.dumps
+        return '[' + ', '.join(
+            f'{{"name": {dumps(name)}, "rating": {_rating(rating)!r}, '
+            f'"reviews": {reviews}, "address": {dumps(address)}}}'
+            for name, rating, reviews, address in zip(self.names, self.ratings, self.reviews, self.addresses)
+        ) + ']'
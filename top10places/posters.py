@@ -0,0 +1,163 @@
+import functools
+import io
+import sys
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from . import assets
+
+# Native raster backend for the title and closing posters. These posters are
+# static centred text, so they are drawn directly with Pillow using the same
+# box model as create_poster_html / create_final_poster_html: a 600x800 white
+# flex column with 20px padding, an h1 (48px bold, 0.67em top margin, 20px
+# bottom margin) and a p (24px italic, 1em margins), centred vertically.
+
+WIDTH = 600
+HEIGHT = 800
+PADDING = 20
+TITLE_SIZE = 48
+SUBTITLE_SIZE = 24
+TITLE_COLOR = '#1F2937'
+SUBTITLE_COLOR = '#6B7280'
+# Chromium synthesises italics for Inter with a 1/4 horizontal skew
+OBLIQUE_SKEW = 0.25
+
+FINAL_POSTER_TEXT = "<br><br><br><br><br><br><br><br>Komen dibawah, spot apa lagi yang harus di-ranking?"
+
+# Theme templates the native posters reproduce; a theme that overrides any of
+# them has its posters rendered by Chromium instead
+TEMPLATES = ('page.html', 'base.css', 'palette.css', 'poster.html', 'poster.css', 'final_poster.html')
+
+@functools.lru_cache(maxsize=None)
+def load_font(weight, size):
+    # Only Inter (see assets.py) matches the HTML design; without it this
+    # raises OSError and the posters are rendered by Chromium instead of in
+    # another typeface
+    return ImageFont.truetype(assets.inter_path(weight), size)
+
+
+def available():
+    # Whether Inter can be loaded for the native posters
+    try:
+        load_font(700, TITLE_SIZE)
+        load_font(400, SUBTITLE_SIZE)
+    except OSError:
+        return False
+    return True
+
+
+def wrap_text(text, font, max_width):
+    # Greedy word wrap; each <br> starts a new line like in the HTML
+    lines = []
+    for segment in text.split('<br>'):
+        line = ""
+        for word in segment.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _block(text, weight, size, color, margin_top, margin_bottom, italic=False):
+    font = load_font(weight, size)
+    ascent, descent = font.getmetrics()
+    lines = wrap_text(text, font, WIDTH - 2 * PADDING) if text else []
+    return {
+        'font': font,
+        'lines': lines,
+        'color': color,
+        'italic': italic,
+        'ascent': ascent,
+        'line_height': ascent + descent,
+        'margin_top': margin_top,
+        'margin_bottom': margin_bottom,
+    }
+
+
+def _draw_line(image, block, text, top):
+    baseline = top + block['ascent']
+    if not block['italic']:
+        ImageDraw.Draw(image).text((WIDTH / 2, baseline), text, font=block['font'], fill=block['color'], anchor='ms')
+        return
+    # Draw into a mask and shear it around the baseline to fake the oblique
+    mask = Image.new('L', (WIDTH, block['line_height']), 0)
+    ImageDraw.Draw(mask).text((WIDTH / 2, block['ascent']), text, font=block['font'], fill=255, anchor='ms')
+    skew = OBLIQUE_SKEW
+    mask = mask.transform(mask.size, Image.AFFINE, (1, skew, -skew * block['ascent'], 0, 1, 0),
+                          resample=Image.BILINEAR)
+    image.paste(Image.new('RGB', mask.size, block['color']), (0, top), mask)
+
+
+def render_poster(title, subtitle, height=HEIGHT):
+    blocks = [
+        _block(title, 700, TITLE_SIZE, TITLE_COLOR, round(TITLE_SIZE * 0.67, 2), 20),
+        _block(subtitle, 400, SUBTITLE_SIZE, SUBTITLE_COLOR, SUBTITLE_SIZE, SUBTITLE_SIZE, italic=True),
+    ]
+    # Flex items do not collapse margins, so the stack height is a plain sum
+    total = sum(b['margin_top'] + len(b['lines']) * b['line_height'] + b['margin_bottom'] for b in blocks)
+    y = PADDING + (height - 2 * PADDING - total) / 2
+
+    image = Image.new('RGB', (WIDTH, height), 'white')
+    for block in blocks:
+        y += block['margin_top']
+        for line in block['lines']:
+            if line:
+                _draw_line(image, block, line, round(y))
+            y += block['line_height']
+        y += block['margin_bottom']
+    return image
+
+
+def render_title_poster(place_type, area, top_n, height=HEIGHT):
+    return render_poster(f"Top {top_n} {place_type} terbaik<br>di {area}", "Menurut google reviews", height)
+
+
+def render_final_poster(height=HEIGHT):
+    return render_poster(FINAL_POSTER_TEXT, "", height)
+
+
+def pixel_diff(a, b, tolerance=64):
+    # Fraction of pixels whose largest channel difference exceeds ``tolerance``
+    if a.size != b.size:
+        return 1.0
+    diff = ImageChops.difference(a.convert('RGB'), b.convert('RGB'))
+    channels = diff.split()
+    peak = ImageChops.lighter(ImageChops.lighter(channels[0], channels[1]), channels[2])
+    changed = sum(peak.point(lambda v: 255 if v > tolerance else 0).histogram()[255:])
+    return changed / (a.size[0] * a.size[1])
+
+
+def cases():
+    # (name, draw the native poster, HTML it reproduces)
+    from .pages import create_final_poster_html, create_poster_html
+
+    return [
+        ("title poster", lambda: render_title_poster("Cafe", "Bandung", 10), create_poster_html("Cafe", "Bandung", 10)),
+        ("final poster", render_final_poster, create_final_poster_html()),
+    ]
+
+
+def reference(html_content):
+    from .renderer import get_renderer
+
+    return Image.open(io.BytesIO(get_renderer().screenshot(html_content)))
+
+
+def check(threshold=0.01):
+    # Compare the native posters against the Chromium renders of the HTML
+    ok = True
+    for name, draw, html_content in cases():
+        diff = pixel_diff(draw(), reference(html_content))
+        ok = ok and diff <= threshold
+        print(f"{name}: {diff:.2%} of pixels differ")
+    return ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["check"]:
+        sys.exit("usage: python -m top10places.posters check")
+    sys.exit(0 if check() else 1)
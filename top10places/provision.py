@@ -0,0 +1,136 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# One-time Chromium provisioning.
+#
+# The check runs once per process on a background thread. A marker file next
+# to the Playwright browser cache, keyed on the Playwright version, records
+# the verified executable, so later processes only stat two files. If the
+# browser is missing it is installed in the background; user requests never
+# run the installer themselves.
+#
+#     python -m top10places.provision     # install at build/boot time
+
+_lock = threading.Lock()
+_done = threading.Event()
+_thread = None
+_state = {
+    'status': 'idle',  # idle, checking, installing, ready, missing, failed
+    'playwright': None,
+    'executable': None,
+    'error': None,
+    'started_at': None,
+    'finished_at': None,
+}
+
+
+def playwright_version():
+    from importlib import metadata
+
+    try:
+        return metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def browsers_path():
+    return os.environ.get("PLAYWRIGHT_BROWSERS_PATH") or os.path.join(
+        os.path.expanduser("~"), ".cache", "ms-playwright"
+    )
+
+
+def marker_path(version):
+    return os.path.join(browsers_path(), f".top10places-chromium-{version}")
+
+
+def _read_marker(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write_marker(path, executable):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(executable)
+    except OSError:
+        pass
+
+
+def _executable_path():
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def _update(**values):
+    with _lock:
+        _state.update(values)
+
+
+def _provision(install):
+    _update(started_at=time.time())
+    try:
+        version = playwright_version()
+        if version is None:
+            raise RuntimeError("playwright is not installed")
+        _update(playwright=version)
+
+        marker = marker_path(version)
+        executable = _read_marker(marker)
+        if not (executable and os.path.exists(executable)):
+            executable = _executable_path()
+            if not os.path.exists(executable):
+                if not install:
+                    _update(status='missing', executable=executable)
+                    return
+                _update(status='installing')
+                subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"],
+                               capture_output=True, text=True, check=True)
+            _write_marker(marker, executable)
+        _update(status='ready', executable=executable)
+    except subprocess.CalledProcessError as e:
+        _update(status='failed', error=e.stderr or str(e))
+    except Exception as e:
+        _update(status='failed', error=str(e))
+    finally:
+        _update(finished_at=time.time())
+        _done.set()
+
+
+def ensure_chromium(install=None):
+    # Start the check (and install, unless disabled) once per process; returns
+    # immediately with the current status
+    global _thread
+    if install is None:
+        install = os.environ.get("PLAYWRIGHT_AUTO_INSTALL", "1") != "0"
+    with _lock:
+        if _thread is None:
+            _state['status'] = 'checking'
+            _thread = threading.Thread(target=_provision, args=(install,), name="provision", daemon=True)
+            _thread.start()
+    return status()
+
+
+def wait(timeout=None):
+    _done.wait(timeout)
+    return status()
+
+
+def status():
+    with _lock:
+        return dict(_state)
+
+
+if __name__ == "__main__":
+    ensure_chromium(install=True)
+    result = wait()
+    print(f"chromium: {result['status']} ({result['executable'] or result['error']})")
+    sys.exit(0 if result['status'] == 'ready' else 1)
@@ -0,0 +1,120 @@
+import heapq
+from operator import itemgetter
+
+from .places import Places, _rating
+
+# Top-N selection for the places list.
+#
+# rank() streams over any iterable of places once, keeping only the best
+# ``top_n`` candidates in a heap (O(n log k)), then orders and summarises the
+# k survivors in a single pass. Strategies decide which places are eligible,
+# which are selected and how the final list is ordered. A Places container is
+# ranked on its columns by index, without materialising any per-place dicts.
+
+
+class Strategy:
+    # The original behaviour: the most reviewed places, best rated first
+    name = 'reviews'
+    label = "Most reviewed"
+
+    # itemgetter keeps the per-place key calls in C
+    select_key = staticmethod(itemgetter('reviews'))
+    order_key = staticmethod(itemgetter('rating'))
+
+    def __init__(self, min_reviews=0):
+        self.min_reviews = min_reviews
+
+    def accept(self, place):
+        return place['reviews'] >= self.min_reviews
+
+    def column_keys(self, places):
+        # (select_key, order_key) over row indices of a Places container
+        return places.reviews.__getitem__, places.ratings.__getitem__
+
+
+class BayesianStrategy(Strategy):
+    # Weighted rating (IMDb style): pulls ratings with few reviews towards a
+    # prior mean, so a 5.0 from 3 reviews does not beat a 4.8 from 3000.
+    name = 'bayesian'
+    label = "Weighted rating"
+
+    def __init__(self, prior_mean=4.0, prior_weight=50, min_reviews=0):
+        super().__init__(min_reviews)
+        self.prior_mean = prior_mean
+        self.prior_weight = prior_weight
+
+    def score(self, place):
+        reviews = place['reviews']
+        return (reviews * place['rating'] + self.prior_weight * self.prior_mean) / (reviews + self.prior_weight)
+
+    def select_key(self, place):
+        return self.score(place)
+
+    def order_key(self, place):
+        return self.score(place)
+
+    def column_keys(self, places):
+        # Score the ratings as parsed, not their float32 approximations, so
+        # ties fall out the same as when ranking the places as dicts
+        mean, weight = self.prior_mean, self.prior_weight
+        scores = [
+            (reviews * _rating(rating) + weight * mean) / (reviews + weight)
+            for rating, reviews in zip(places.ratings, places.reviews)
+        ]
+        return scores.__getitem__, scores.__getitem__
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (Strategy, BayesianStrategy)}
+
+
+def get_strategy(strategy='reviews', **options):
+    if isinstance(strategy, Strategy):
+        return strategy
+    return STRATEGIES[strategy](**options)
+
+
+def _rank_columns(places, top_n, strategy):
+    select_key, order_key = strategy.column_keys(places)
+    indices = range(len(places))
+    if strategy.min_reviews:
+        reviews, min_reviews = places.reviews, strategy.min_reviews
+        indices = [i for i in indices if reviews[i] >= min_reviews]
+
+    top = heapq.nlargest(top_n, indices, key=select_key)
+    top.sort(key=order_key, reverse=True)
+    top_places = places.take(top)
+    return {
+        'places': top_places,
+        'most_reviews': top_places.max('reviews') if top else 0,
+        'highest_rating': top_places.max('rating') if top else 0,
+    }
+
+
+def rank(places, top_n, strategy='reviews', **options):
+    strategy = get_strategy(strategy, **options)
+    if isinstance(places, Places):
+        if hasattr(places, 'ranking'):
+            # A PlaceIndex keeps its rankings current as pastes are merged
+            return places.ranking(top_n, strategy)
+        return _rank_columns(places, top_n, strategy)
+    if strategy.min_reviews:
+        places = filter(strategy.accept, places)
+
+    # nlargest is documented as equivalent to sorted(reverse=True)[:n],
+    # ties included, so the default strategy matches the old double sort
+    top_places = heapq.nlargest(top_n, places, key=strategy.select_key)
+    top_places.sort(key=strategy.order_key, reverse=True)
+
+    most_reviews = 0
+    highest_rating = 0
+    for place in top_places:
+        if place['reviews'] > most_reviews:
+            most_reviews = place['reviews']
+        if place['rating'] > highest_rating:
+            highest_rating = place['rating']
+
+    return {
+        'places': top_places,
+        'most_reviews': most_reviews,
+        'highest_rating': highest_rating,
+    }
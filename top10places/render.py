@@ -0,0 +1,278 @@
+import asyncio
+import io
+import math
+
+from . import tracing
+from .artifacts import ImageArtifact
+from .charts import render_scatter
+from .encoding import encode, encode_image, get_preset
+from .pages import CHART_TITLE, carousel_frames, create_final_poster_html, create_poster_html, page_html
+from .places import Places
+from .ranking import rank
+from .renderer import DEFAULT_VIEWPORT, get_renderer
+from .templating import DEFAULT_THEME, overrides
+
+# Rasterise the carousel frames. Each render has an async version that runs on
+# the shared renderer loop and a blocking wrapper with the original signature.
+# Pillow and the native poster backend are imported on first use.
+
+
+async def create_poster_image_async(place_type, area, top_n):
+    # Draw the poster natively; render the HTML in Chromium if no font is available
+    from .posters import render_title_poster
+
+    try:
+        return await asyncio.to_thread(render_title_poster, place_type, area, top_n)
+    except OSError:
+        pass
+    
+    html_content = create_poster_html(place_type, area, top_n)
+    
+    # Wait for fonts to load and the page to signal it is rendered, then capture
+    screenshot = await get_renderer().capture(html_content)
+    
+    # Convert the screenshot to a PIL Image
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(screenshot))
+    
+    return image
+
+
+def create_poster_image(place_type, area, top_n):
+    return get_renderer().call(create_poster_image_async, place_type, area, top_n)
+
+
+async def html_to_image_top10_async(html_content):
+    renderer = get_renderer()
+    
+    async def capture(page):
+        with tracing.span("set_content", bytes=len(html_content)):
+            await page.set_content(html_content)
+        
+        # Wait for fonts, icons and the places list script to finish
+        await renderer.wait_ready(page)
+        
+        # Get the bounding box of the content
+        bounding_box = await page.evaluate('''() => {
+            const body = document.body;
+            const html = document.documentElement;
+            const height = Math.max(
+                body.scrollHeight, body.offsetHeight,
+                html.clientHeight, html.scrollHeight, html.offsetHeight
+            );
+            return {
+                width: document.documentElement.clientWidth,
+                height: height
+            };
+        }''')
+        
+        # Calculate the aspect ratio
+        aspect_ratio = 800 / 600
+        content_ratio = bounding_box['height'] / bounding_box['width']
+        
+        if content_ratio > aspect_ratio:
+            # Content is taller, adjust width
+            new_width = math.ceil(bounding_box['height'] / aspect_ratio)
+            await page.set_viewport_size({'width': new_width, 'height': bounding_box['height']})
+        else:
+            # Content is wider, adjust height
+            new_height = math.ceil(bounding_box['width'] * aspect_ratio)
+            await page.set_viewport_size({'width': bounding_box['width'], 'height': new_height})
+        
+        # Capture the screenshot
+        with tracing.span("screenshot", count=1) as stage:
+            screenshot = await page.screenshot(full_page=True)
+            stage['bytes'] = len(screenshot)
+        
+        return screenshot, {'height': bounding_box['height']}
+    
+    # Identical lists render identically, so serve repeats from the render cache
+    key = renderer.cache_key(html_content, fit='3:4')
+    screenshot, meta = await renderer.cached(key, lambda: renderer.with_page(capture))
+    return screenshot, meta['height']
+
+
+def html_to_image_top10(html_content):
+    return get_renderer().call(html_to_image_top10_async, html_content)
+
+
+def html_to_image(html_content):
+    # Wait for the page to signal it is rendered, then capture
+    return get_renderer().screenshot(html_content, full_page=True)
+
+
+async def create_final_poster_image_async():
+    # Draw the poster natively; render the HTML in Chromium if no font is available
+    from .posters import render_final_poster
+
+    try:
+        return await asyncio.to_thread(render_final_poster)
+    except OSError:
+        pass
+    
+    html_content = create_final_poster_html()
+    
+    # Wait for fonts to load and the page to signal it is rendered, then capture
+    screenshot = await get_renderer().capture(html_content)
+    
+    # Convert the screenshot to a PIL Image
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(screenshot))
+    
+    return image
+
+
+def create_final_poster_image():
+    return get_renderer().call(create_final_poster_image_async)
+
+
+# Lays out every frame of a composed page at its render size, pads frames
+# with an aspect out to it, and returns each frame's box in page coordinates
+FIT_FRAMES_SCRIPT = '''(frames) => frames.map((frame) => {
+    const section = document.getElementById('frame-' + frame.key);
+    // Like a standalone page, a frame is at least one viewport tall
+    const height = Math.max(section.offsetHeight, frame.min_height);
+    if (frame.aspect) {
+        const ratio = frame.aspect[1] / frame.aspect[0];
+        if (height / frame.width > ratio) {
+            section.style.width = Math.ceil(height / ratio) + 'px';
+            section.style.height = height + 'px';
+        } else {
+            section.style.height = Math.ceil(frame.width * ratio) + 'px';
+        }
+    }
+    const box = section.getBoundingClientRect();
+    return {
+        x: box.left + window.scrollX,
+        y: box.top + window.scrollY,
+        width: box.width,
+        height: box.height,
+        content_height: height
+    };
+})'''
+
+
+def stacked_boxes(frames):
+    # Boxes of sized frames in a composed page: the sections stack top to
+    # bottom from the page origin
+    boxes = []
+    y = 0
+    for frame in frames:
+        boxes.append({'x': 0, 'y': y, 'width': frame['width'], 'height': frame['height'],
+                      'content_height': frame['height']})
+        y += frame['height']
+    return boxes
+
+
+async def capture_frames_async(frames, screenshot_options=None):
+    # Render frames from one page load and return a (png, meta) pair per frame.
+    # Frames already in the render cache are not laid out again.
+    # ``screenshot_options`` (e.g. type='jpeg') go to page.screenshot().
+    renderer = get_renderer()
+    screenshot_options = screenshot_options or {}
+    keys = [
+        renderer.cache_key(page_html([frame], "Frame", sized=True), composite=True, **screenshot_options)
+        for frame in frames
+    ]
+    entries = [None] * len(frames)
+    if renderer.cache is not None:
+        with tracing.span("cache lookup", count=len(keys)) as stage:
+            entries = [await asyncio.to_thread(renderer.cache.get, key) for key in keys]
+            stage['hits'] = sum(1 for entry in entries if entry is not None)
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if not missing:
+        return entries
+    
+    pending = [frames[i] for i in missing]
+    html_content = page_html(pending, "Carousel", sized=True)
+    
+    async def capture(page):
+        with tracing.span("set_content", bytes=len(html_content), count=len(pending)):
+            await page.set_content(html_content)
+        await renderer.wait_ready(page)
+        if all(frame['height'] for frame in pending):
+            # Every frame has its final size already: one layout, no measuring
+            boxes = stacked_boxes(pending)
+        else:
+            with tracing.span("layout", count=len(pending)):
+                boxes = await page.evaluate(FIT_FRAMES_SCRIPT, [
+                    {'key': frame['key'], 'width': frame['width'], 'min_height': DEFAULT_VIEWPORT['height'],
+                     'aspect': frame['aspect']}
+                    for frame in pending
+                ])
+        shots = []
+        for box in boxes:
+            clip = {name: box[name] for name in ('x', 'y', 'width', 'height')}
+            with tracing.span("screenshot", count=1) as stage:
+                shot = await page.screenshot(clip=clip, full_page=True, **screenshot_options)
+                stage['bytes'] = len(shot)
+            shots.append((shot, {'height': box['content_height']}))
+        return shots
+    
+    for i, entry in zip(missing, await renderer.with_page(capture)):
+        entries[i] = entry
+        if renderer.cache is not None:
+            await asyncio.to_thread(renderer.cache.put, keys[i], *entry)
+    return entries
+
+
+def capture_frames(frames, screenshot_options=None):
+    return get_renderer().call(capture_frames_async, frames, screenshot_options)
+
+
+async def create_carousel_images_async(place_type, area, top_n, places, strategy='reviews', preset='png',
+                                       theme=DEFAULT_THEME, aspect='3:4', split=False, chart=False):
+    # The carousel in order as ImageArtifacts: title poster, the list
+    # frame(s), the chart when asked for, closing poster
+    from . import posters
+
+    preset = get_preset(preset)
+    options = preset.screenshot_options()
+    
+    def captured(entry):
+        # Re-encode a Chromium frame unless Chromium already wrote the preset's format
+        artifact = ImageArtifact(entry[0], options.get('type', 'png'))
+        return encode(artifact, preset, native=bool(options))
+    
+    with tracing.span("frames") as stage:
+        frames = carousel_frames(places, area, place_type, top_n, strategy, theme, aspect, split, chart)
+        stage['count'] = len(frames)
+    poster, lists, final = frames[0], frames[1:-1], frames[-1]
+    native = not any(overrides(theme, name) for name in posters.TEMPLATES)
+    if not (native and await asyncio.to_thread(posters.available)):
+        # Themed posters, or no font for the native ones: every frame comes
+        # from one page load
+        entries = await capture_frames_async(frames, options)
+        return await asyncio.to_thread(lambda: [captured(entry) for entry in entries])
+    
+    # Draw the posters (and the chart) natively while Chromium lays out the list
+    def drawn(stage, render, *args):
+        with tracing.span(stage):
+            image = render(*args)
+        return encode_image(image, preset)
+    
+    charts = []
+    if chart and not (overrides(theme, 'chart.html') or overrides(theme, 'chart.css')):
+        *lists, chart_frame = lists
+        top_places = rank(Places.from_places(places), top_n, strategy)['places']
+        charts.append(asyncio.to_thread(drawn, "native chart", render_scatter, top_places, CHART_TITLE,
+                                        chart_frame['width'], chart_frame['height']))
+    
+    poster_image, list_entries, final_poster_image, *chart_image = await asyncio.gather(
+        asyncio.to_thread(drawn, "native poster", posters.render_title_poster, place_type, area, top_n,
+                          poster['height']),
+        capture_frames_async(lists, options),
+        asyncio.to_thread(drawn, "native poster", posters.render_final_poster, final['height']),
+        *charts,
+    )
+    list_images = await asyncio.to_thread(lambda: [captured(entry) for entry in list_entries])
+    # Every frame keeps its encoded bytes; Pillow decodes only on demand
+    return [poster_image, *list_images, *chart_image, final_poster_image]
+
+
+def create_carousel_images(place_type, area, top_n, places, strategy='reviews', preset='png', theme=DEFAULT_THEME,
+                           aspect='3:4', split=False, chart=False):
+    return get_renderer().call(create_carousel_images_async, place_type, area, top_n, places, strategy, preset, theme,
+                               aspect, split, chart)
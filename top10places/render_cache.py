@@ -0,0 +1,164 @@
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# Content-addressed cache for rendered images.
+#
+# Entries are keyed by a hash of the final HTML, the viewport, the capture
+# options and the renderer version, so identical inputs from any session or
+# rerun return the stored PNG bytes without touching the browser. A bounded
+# in-memory LRU sits in front of an on-disk tier that is evicted by total size.
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "top10places-render-cache")
+
+
+def make_key(html_content, viewport, version, **options):
+    digest = hashlib.sha256()
+    digest.update(html_content.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps({'viewport': viewport, 'version': version, 'options': options},
+                             sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, directory=DEFAULT_DIRECTORY, memory_bytes=64 * 1024 * 1024,
+                 disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._disk_size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _entries(self):
+        # Cache files, leaving out ``.tmp`` files another writer has not renamed yet
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".tmp")]
+
+    def get(self, key):
+        # Return (data, meta) or None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, data, meta=None):
+        entry = (bytes(data), meta or {})
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory:
+            self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        if len(entry[0]) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous[0])
+        self._memory[key] = entry
+        self._memory_size += len(entry[0])
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted[0])
+
+    # On disk each entry is one file: a JSON line of metadata, then the bytes
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        header, newline, data = blob.partition(b"\n")
+        try:
+            if not newline:
+                raise ValueError("missing header")
+            return data, json.loads(header)
+        except ValueError:
+            # A truncated or corrupt file: drop it and count a miss
+            self._remove(path)
+            return None
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_size -= size
+
+    def _write_disk(self, key, entry):
+        data, meta = entry
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(meta).encode("utf-8") + b"\n")
+                f.write(data)
+            size = os.path.getsize(tmp_path)
+            existing = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_size += size - existing
+            if self._disk_size > self.disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        # Drop least recently used files (by mtime, refreshed on every hit)
+        entries = sorted(
+            self._entries(),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._disk_size <= self.disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._disk_size -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_bytes': self._disk_size,
+            }
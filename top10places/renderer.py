@@ -0,0 +1,336 @@
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+from . import assets, tracing
+from .pages import READY_SELECTOR
+from .render_cache import DEFAULT_DIRECTORY, RenderCache, make_key
+
+# Process-wide Chromium service shared by every render function.
+#
+# Streamlit re-executes app.py on every rerun but keeps imported modules alive,
+# so the browser launched here stays warm across reruns and sessions. The
+# Playwright objects live on one background thread running an asyncio loop;
+# callers from any thread submit work to that loop and block on the result.
+
+DEFAULT_VIEWPORT = {'width': 600, 'height': 800}
+
+# Part of every render cache key; bump when capture output changes
+RENDER_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class RendererError(RuntimeError):
+    pass
+
+
+class Renderer:
+    def __init__(self, max_pages=4, health_interval=30, job_timeout=60, ready_timeout=5000,
+                 routes=None, cache=None, launch_options=None):
+        self.max_pages = max_pages
+        self.cache = cache
+        # (url pattern, async handler) pairs installed on every page context
+        self.routes = list(routes or [])
+        self.ready_timeout = ready_timeout
+        self.health_interval = health_interval
+        self.job_timeout = job_timeout
+        self.launch_options = launch_options or {}
+        self.restarts = 0
+        self.launched_at = None
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+        self._semaphore = None
+        self._idle = []
+        self._busy = 0
+        self._health_task = None
+        self._closed = False
+        self.waits = collections.deque(maxlen=200)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        # Start the event loop thread; Chromium itself launches on first use
+        with self._lock:
+            if self._closed:
+                raise RendererError("Renderer has been shut down.")
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run, name="renderer", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._browser_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        if self.health_interval:
+            self._health_task = loop.create_task(self._health_loop())
+        self._started.set()
+        loop.run_forever()
+        loop.close()
+
+    async def _launch(self):
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        self._idle = []
+        with tracing.span("browser launch"):
+            self._browser = await self._playwright.chromium.launch(**self.launch_options)
+        self.launched_at = time.time()
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if self._browser is not None:
+                # The browser crashed or was killed; drop its pages and relaunch
+                self.restarts += 1
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+            await self._launch()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            if self._browser is None:
+                continue
+            try:
+                await self._ensure_browser()
+                # Probe the idle pages out of the pool, so a render that
+                # starts meanwhile cannot take one that is being checked
+                pages, self._idle = self._idle, []
+                for page in pages:
+                    try:
+                        await page.evaluate("1")
+                    except Exception:
+                        await self._discard(page)
+                    else:
+                        self._idle.append(page)
+            except Exception:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+
+    async def _close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for page in self._idle:
+            await self._discard(page)
+        self._idle = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    # -- page pool ---------------------------------------------------------
+
+    async def _acquire(self, viewport):
+        await self._semaphore.acquire()
+        try:
+            await self._ensure_browser()
+            while self._idle:
+                page = self._idle.pop()
+                if page.is_closed():
+                    continue
+                await page.set_viewport_size(viewport)
+                self._busy += 1
+                return page
+            context = await self._browser.new_context(viewport=viewport)
+            for pattern, handler in self.routes:
+                await context.route(pattern, handler)
+            page = await context.new_page()
+            self._busy += 1
+            return page
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _release(self, page, healthy):
+        self._busy -= 1
+        try:
+            if healthy and not page.is_closed() and self._browser.is_connected():
+                self._idle.append(page)
+            else:
+                await self._discard(page)
+        finally:
+            self._semaphore.release()
+
+    async def _discard(self, page):
+        try:
+            await page.context.close()
+        except Exception:
+            pass
+
+    async def with_page(self, callback, viewport=None, retries=1):
+        # Run ``await callback(page)`` on a pooled page and return its result
+        viewport = dict(viewport or DEFAULT_VIEWPORT)
+        for attempt in range(retries + 1):
+            page = await self._acquire(viewport)
+            healthy = False
+            try:
+                result = await callback(page)
+                healthy = True
+                return result
+            except Exception:
+                # Retry once on a fresh page if the browser went away mid-render
+                if attempt < retries and not self._browser.is_connected():
+                    continue
+                raise
+            finally:
+                await self._release(page, healthy)
+
+    async def wait_ready(self, page, timeout=None):
+        # Wait for the template's ready marker, bounded by ``timeout`` ms. Pages
+        # that never signal are captured as-is once the bound is reached.
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        timeout = self.ready_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        timed_out = False
+        with tracing.span("ready wait") as stage:
+            try:
+                await page.wait_for_selector(READY_SELECTOR, state='attached', timeout=timeout)
+            except PlaywrightTimeoutError:
+                timed_out = stage['timed_out'] = True
+        elapsed = (time.perf_counter() - start) * 1000
+        self.waits.append({'ms': elapsed, 'timed_out': timed_out})
+        logger.info("render ready wait %.1f ms%s", elapsed, " (timed out)" if timed_out else "")
+        return elapsed
+
+    def cache_key(self, html_content, viewport=None, **options):
+        return make_key(html_content, viewport or DEFAULT_VIEWPORT, RENDER_VERSION, **options)
+
+    async def cached(self, key, produce):
+        # Return (data, meta) from the cache, or await ``produce()`` and store it
+        if self.cache is None:
+            return await produce()
+        entry = await asyncio.to_thread(self.cache.get, key)
+        if entry is None:
+            entry = await produce()
+            await asyncio.to_thread(self.cache.put, key, *entry)
+        return entry
+
+    async def capture(self, html_content, viewport=None, full_page=False, ready_timeout=None):
+        async def capture(page):
+            with tracing.span("set_content", bytes=len(html_content)):
+                await page.set_content(html_content)
+            await self.wait_ready(page, ready_timeout)
+            with tracing.span("screenshot", count=1) as stage:
+                shot = await page.screenshot(full_page=full_page)
+                stage['bytes'] = len(shot)
+            return shot, {}
+
+        key = self.cache_key(html_content, viewport, full_page=full_page)
+        entry = await self.cached(key, lambda: self.with_page(capture, viewport))
+        return entry[0]
+
+    # -- sync API ----------------------------------------------------------
+    #
+    # Blocking wrappers for callers outside the renderer loop (Streamlit
+    # script threads, batch workers). Coroutines passed to call() run on the
+    # loop, so several renders can be awaited concurrently with gather().
+
+    def call(self, coro_fn, *args, timeout=None, **kwargs):
+        self.start()
+        coro = coro_fn(*args, **kwargs)
+        if tracing.current() is not None:
+            # The loop thread has its own context; carry the caller's trace over
+            coro = tracing.within(tracing.current(), coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout or self.job_timeout)
+        except concurrent.futures.TimeoutError:
+            # Cancel the render so it gives back its page and its slot
+            future.cancel()
+            raise
+
+    def warm(self, timeout=None):
+        # Launch Chromium now rather than on the first render
+        self.call(self._ensure_browser, timeout=timeout)
+
+    def run(self, callback, viewport=None, timeout=None):
+        return self.call(self.with_page, callback, viewport, timeout=timeout)
+
+    def screenshot(self, html_content, viewport=None, full_page=False, ready_timeout=None):
+        return self.call(self.capture, html_content, viewport, full_page, ready_timeout)
+
+    def wait_stats(self):
+        waits = list(self.waits)
+        if not waits:
+            return {'count': 0, 'avg_ms': 0, 'max_ms': 0, 'timeouts': 0}
+        return {
+            'count': len(waits),
+            'avg_ms': sum(w['ms'] for w in waits) / len(waits),
+            'max_ms': max(w['ms'] for w in waits),
+            'timeouts': sum(1 for w in waits if w['timed_out']),
+        }
+
+    def health(self):
+        running = self._thread is not None and self._thread.is_alive()
+        connected = bool(running and self._browser is not None and self._browser.is_connected())
+        return {
+            'running': running,
+            'connected': connected,
+            'max_pages': self.max_pages,
+            'idle_pages': len(self._idle),
+            'busy_pages': self._busy,
+            'restarts': self.restarts,
+            'uptime': time.time() - self.launched_at if connected and self.launched_at else 0,
+            'ready_waits': self.wait_stats(),
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'assets': assets.status(),
+        }
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = Renderer(
+                routes=[(assets.ROUTE_PATTERN, assets.route_handler)],
+                max_pages=int(os.environ.get("RENDER_MAX_PAGES", "4")),
+                ready_timeout=int(os.environ.get("RENDER_READY_TIMEOUT_MS", "5000")),
+                cache=RenderCache(
+                    directory=os.environ.get("RENDER_CACHE_DIR", DEFAULT_DIRECTORY) or None,
+                    memory_bytes=int(os.environ.get("RENDER_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+                    disk_bytes=int(os.environ.get("RENDER_CACHE_DISK_MB", "512")) * 1024 * 1024,
+                ),
+            )
+            atexit.register(_renderer.shutdown)
+        return _renderer
@@ -0,0 +1,90 @@
+import functools
+import os
+
+# Theme loader for the page templates.
+#
+# A theme is a directory of Jinja2 templates (page.html, base.css,
+# poster.html, poster.css, final_poster.html, list.html, list.css,
+# scatter.html). Any file a theme leaves out is taken from the built-in
+# "classic" theme, so a new design can be as small as one CSS file. Themes are
+# looked up in TOP10PLACES_THEMES (os.pathsep separated directories) before
+# the bundled top10places/themes, so designs can be added without touching
+# Python:
+#
+#     my-themes/midnight/list.css
+#     TOP10PLACES_THEMES=my-themes streamlit run app.py
+#
+# Each theme's environment is built once per process; Jinja2 compiles every
+# template on first use and, with auto_reload off, never re-reads it.
+# Autoescaping is on, so place names and addresses are always escaped.
+
+THEMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'themes')
+DEFAULT_THEME = 'classic'
+
+
+def theme_dirs():
+    extra = [path for path in os.environ.get("TOP10PLACES_THEMES", "").split(os.pathsep) if path]
+    return extra + [THEMES_DIR]
+
+
+def available_themes():
+    names = set()
+    for directory in theme_dirs():
+        if os.path.isdir(directory):
+            names.update(entry.name for entry in os.scandir(directory)
+                         if entry.is_dir() and not entry.name.startswith(('.', '_')))
+    return [DEFAULT_THEME] + sorted(names - {DEFAULT_THEME})
+
+
+def theme_path(theme):
+    for directory in theme_dirs():
+        path = os.path.join(directory, theme)
+        if os.path.isdir(path):
+            return path
+    raise KeyError(f"Unknown theme {theme!r}; available: {', '.join(available_themes())}")
+
+
+def overrides(theme, name):
+    # Whether ``theme`` replaces the classic version of template ``name``
+    return theme != DEFAULT_THEME and os.path.exists(os.path.join(theme_path(theme), name))
+
+
+def js_number(value):
+    # Format a float the way JavaScript prints numbers (100, not 100.0)
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def to_fixed(value, digits=1):
+    # Number.prototype.toFixed: rounds the exact binary value half up
+    from decimal import ROUND_HALF_UP, Decimal
+
+    return str(Decimal(value).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+@functools.lru_cache(maxsize=None)
+def environment(theme=DEFAULT_THEME):
+    import jinja2
+
+    paths = [theme_path(theme)]
+    if theme != DEFAULT_THEME:
+        paths.append(theme_path(DEFAULT_THEME))
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(paths),
+        autoescape=True,
+        auto_reload=False,
+        cache_size=-1,
+    )
+    env.filters['js_number'] = js_number
+    env.filters['to_fixed'] = to_fixed
+    return env
+
+
+def render(theme, name, **context):
+    return environment(theme).get_template(name).render(**context)
+
+
+def markup(text):
+    # Mark already rendered HTML/CSS as safe to embed in another template
+    from markupsafe import Markup
+
+    return Markup(text)
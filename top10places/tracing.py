@@ -0,0 +1,265 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+
+# Per-stage timing for generations.
+#
+# A trace covers one generation; spans inside it time the stages (parse,
+# create_html, browser launch, set_content, ready wait, screenshot, encode,
+# zip, upload) and may carry a byte size and an item count:
+#
+#     with trace("generate", area=area):
+#         with span("parse") as stage:
+#             places = parse_text(text)
+#             stage['count'] = len(places)
+#
+# Spans opened outside a trace are still counted. Every span feeds a
+# process-wide registry exported in the Prometheus text format (metrics(),
+# serve_metrics()); every finished trace is logged as one JSON line on the
+# "top10places.trace" logger. Renderer coroutines and render worker
+# processes report into the trace of the caller that started them.
+
+logger = logging.getLogger("top10places.trace")
+
+# Histogram buckets in seconds, from a cached template to a cold browser launch
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current = contextvars.ContextVar("top10places_trace", default=None)
+
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.start = time.perf_counter()
+        self.ms = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def merge(self, spans, offset_ms=None):
+        # Spans timed elsewhere (a render worker); their start is re-based
+        # onto this trace, relative to ``offset_ms`` when given
+        for span in spans:
+            span = dict(span)
+            if offset_ms is not None:
+                span['start_ms'] += offset_ms
+            self.add(span)
+            REGISTRY.observe(span)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def as_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start_ms'])
+        return {'trace': self.name, 'ms': self.ms, **self.attrs, 'spans': spans}
+
+    def totals(self):
+        # Total time, bytes and items per stage, in first-seen order
+        totals = {}
+        for span in self.as_dict()['spans']:
+            total = totals.setdefault(span['name'], {'stage': span['name'], 'calls': 0, 'ms': 0.0,
+                                                     'bytes': 0, 'count': 0})
+            total['calls'] += 1
+            total['ms'] += span['ms']
+            total['bytes'] += span.get('bytes') or 0
+            total['count'] += span.get('count') or 0
+        return list(totals.values())
+
+
+class Registry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.stages = {}
+        self.traces = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        seconds = span['ms'] / 1000
+        with self._lock:
+            stage = self.stages.get(span['name'])
+            if stage is None:
+                stage = self.stages[span['name']] = {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0,
+                                                     'bytes': 0, 'items': 0, 'errors': 0}
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                stage['buckets'][index] += 1
+            stage['count'] += 1
+            stage['sum'] += seconds
+            stage['bytes'] += span.get('bytes') or 0
+            stage['items'] += span.get('count') or 0
+            stage['errors'] += 1 if span.get('error') else 0
+
+    def finished(self, trace, failed):
+        with self._lock:
+            counts = self.traces.setdefault(trace.name, {'ok': 0, 'error': 0})
+            counts['error' if failed else 'ok'] += 1
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.traces.clear()
+
+    def prometheus(self):
+        # Text exposition format, version 0.0.4
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage['buckets'])) for name, stage in self.stages.items()}
+            traces = {name: dict(counts) for name, counts in self.traces.items()}
+        lines = [
+            "# HELP top10places_stage_seconds Time spent in each generation stage.",
+            "# TYPE top10places_stage_seconds histogram",
+        ]
+        for name, stage in sorted(stages.items()):
+            label = f'stage="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, stage['buckets']):
+                cumulative += count
+                lines.append(f'top10places_stage_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'top10places_stage_seconds_bucket{{{label},le="+Inf"}} {stage["count"]}')
+            lines.append(f"top10places_stage_seconds_sum{{{label}}} {stage['sum']:.6f}")
+            lines.append(f"top10places_stage_seconds_count{{{label}}} {stage['count']}")
+        for metric, key, help_text in (
+            ("top10places_stage_bytes_total", 'bytes', "Bytes produced by each stage."),
+            ("top10places_stage_items_total", 'items', "Items (places, frames, files) handled by each stage."),
+            ("top10places_stage_errors_total", 'errors', "Stage runs that raised."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, stage in sorted(stages.items()):
+                lines.append(f'{metric}{{stage="{_escape(name)}"}} {stage[key]}')
+        lines.append("# HELP top10places_traces_total Finished traces by outcome.")
+        lines.append("# TYPE top10places_traces_total counter")
+        for name, counts in sorted(traces.items()):
+            for outcome, count in counts.items():
+                lines.append(f'top10places_traces_total{{trace="{_escape(name)}",outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def trace(name, export=True, **attrs):
+    # Start a trace for this thread (and the coroutines and threads it
+    # starts); ``export`` logs it and counts it when it ends
+    current_trace = Trace(name, **attrs)
+    token = _current.set(current_trace)
+    failed = False
+    try:
+        yield current_trace
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current.reset(token)
+        current_trace.ms = current_trace.elapsed_ms()
+        if export and current_trace.spans:
+            REGISTRY.finished(current_trace, failed)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps(dict(current_trace.as_dict(), error=failed), default=str))
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    # Time a stage; set 'bytes' and 'count' on the yielded dict to report them
+    current_trace = _current.get()
+    start = time.perf_counter()
+    record = {'name': name, **attrs}
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        record['ms'] = (end - start) * 1000
+        record['start_ms'] = (start - current_trace.start) * 1000 if current_trace is not None else 0.0
+        if current_trace is not None:
+            current_trace.add(record)
+        REGISTRY.observe(record)
+
+
+async def within(current_trace, coro):
+    # Run ``coro`` inside ``current_trace``; used to carry the caller's trace
+    # onto the renderer loop thread
+    token = _current.set(current_trace)
+    try:
+        return await coro
+    finally:
+        _current.reset(token)
+
+
+def metrics():
+    return REGISTRY.prometheus()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port=None, host="0.0.0.0"):
+    # Serve /metrics on a background thread, once per process. The port
+    # defaults to TOP10PLACES_METRICS_PORT; nothing is served without one.
+    global _server
+    port = port if port is not None else os.environ.get("TOP10PLACES_METRICS_PORT")
+    if port is None or port == "":
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+        import http.server
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _server = http.server.ThreadingHTTPServer((host, int(port)), Handler)
+        except OSError as e:
+            # Another process (a second Streamlit worker) already serves it
+            logger.warning("metrics endpoint not started on port %s: %s", port, e)
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
+
+
+def configure_logging():
+    # Send trace lines to TOP10PLACES_TRACE_LOG ("-" for stderr, or a file),
+    # one JSON object per line; safe to call on every rerun
+    target = os.environ.get("TOP10PLACES_TRACE_LOG")
+    if not target or getattr(logger, "_top10places_handler", None):
+        return
+    handler = logging.StreamHandler() if target == "-" else logging.FileHandler(target, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger._top10places_handler = handler